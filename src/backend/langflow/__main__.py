@@ -5,6 +5,7 @@ from pathlib import Path
 import typer
 from fastapi.staticfiles import StaticFiles
 
+from langflow.interface.catalog import component_catalog
 from langflow.main import create_app
 from langflow.settings import settings
 from langflow.utils.logger import configure
@@ -91,6 +92,8 @@ def serve(
 
     configure(log_level=log_level, log_file=log_file)
     update_settings(config, dev=dev)
+    # Build (or load) the component catalog once before the workers are forked
+    component_catalog.get()
     app = create_app()
     # get the directory of the current file
     path = Path(__file__).parent
@@ -1,32 +1,271 @@
 import asyncio
-from typing import Any
+import json
+import time
+from typing import Any, Dict, List, Optional
 
 from langchain.callbacks.base import AsyncCallbackHandler, BaseCallbackHandler
+from langchain.schema import AgentAction, AgentFinish
 
-from langflow.api.schemas import ChatResponse
+from langflow.api.schemas import ChatResponse, ThoughtStep
+from langflow.settings import settings
+from langflow.utils.logger import logger
+
+
+def _stream_frame_template():
+    # Encode a stream response once, so each frame only encodes its text
+    placeholder = "\0"
+    response = ChatResponse(message=placeholder, type="stream", intermediate_steps="")
+    prefix, suffix = json.dumps(response.dict()).split(json.dumps(placeholder))
+    return prefix, suffix
+
+
+STREAM_FRAME_PREFIX, STREAM_FRAME_SUFFIX = _stream_frame_template()
+
+
+def encode_stream_frame(text: str) -> str:
+    """Encode a stream response, same as json.dumps(ChatResponse(...).dict())."""
+    return f"{STREAM_FRAME_PREFIX}{json.dumps(text)}{STREAM_FRAME_SUFFIX}"
+
+
+class QueueSender:
+    """
+    Stands in for a websocket in the streaming callback handlers, and
+    puts what is sent to it in a queue that can be iterated instead.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def send_json(self, data: Any) -> None:
+        await self.queue.put(data)
+
+    async def send_text(self, data: str) -> None:
+        await self.queue.put(data)
+
+    async def close(self) -> None:
+        await self.queue.put(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        data: Optional[Any] = await self.queue.get()
+        if data is None:
+            raise StopAsyncIteration
+        return data
 
 
 # https://github.com/hwchase17/chat-langchain/blob/master/callback.py
 class AsyncStreamingLLMCallbackHandler(AsyncCallbackHandler):
-    """Callback handler for streaming LLM responses."""
+    """
+    Callback handler for streaming LLM responses.
+
+    Tokens are buffered and sent together, once max_tokens are buffered
+    or flush_interval seconds after the first one, so that fast models
+    don't send a message per token.
+    """
 
-    def __init__(self, websocket):
+    def __init__(
+        self,
+        websocket,
+        max_tokens: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
         self.websocket = websocket
+        self.max_tokens = max_tokens or settings.stream_max_tokens
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else settings.stream_flush_interval
+        )
+        self._tokens: List[str] = []
+        self._first_token_at = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_flush: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
 
     async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        resp = ChatResponse(message=token, type="stream", intermediate_steps="")
-        await self.websocket.send_json(resp.dict())
+        if not self._tokens:
+            self._first_token_at = time.monotonic()
+            if self.flush_interval > 0:
+                # Send the tokens even if the model pauses
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.flush_interval, self._flush_later
+                )
+        self._tokens.append(token)
+        if (
+            len(self._tokens) >= self.max_tokens
+            or time.monotonic() - self._first_token_at >= self.flush_interval
+        ):
+            await self.flush()
+
+    async def on_llm_end(self, response, **kwargs: Any) -> None:
+        await self.flush()
+
+    async def on_llm_error(self, error, **kwargs: Any) -> None:
+        await self.flush()
+
+    def _flush_later(self) -> None:
+        self._timer = None
+        self._timer_flush = asyncio.ensure_future(self._flush_on_timer())
+
+    async def _flush_on_timer(self) -> None:
+        # Nothing awaits this task, so its errors are logged here
+        try:
+            await self.flush()
+        except Exception as exc:
+            logger.warning(f"Could not send streamed tokens: {exc}")
+
+    def cancel(self) -> None:
+        """Drop the buffered tokens, when the run was cancelled."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._timer_flush is not None:
+            self._timer_flush.cancel()
+            self._timer_flush = None
+        self._tokens = []
+
+    async def flush(self) -> None:
+        """Send the buffered tokens as a single stream response."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        timer_flush = self._timer_flush
+        if timer_flush is not None and timer_flush is not asyncio.current_task():
+            # Let a flush started by the timer finish first
+            self._timer_flush = None
+            await timer_flush
+        if not self._tokens:
+            return
+        text = "".join(self._tokens)
+        self._tokens = []
+        # Frames are sent in order, even when the timer flushes
+        async with self._lock:
+            if hasattr(self.websocket, "send_text"):
+                await self.websocket.send_text(encode_stream_frame(text))
+            else:
+                resp = ChatResponse(message=text, type="stream", intermediate_steps="")
+                await self.websocket.send_json(resp.dict())
 
 
 class StreamingLLMCallbackHandler(BaseCallbackHandler):
-    """Callback handler for streaming LLM responses."""
+    """
+    Callback handler for streaming LLM responses of a sync chain.
 
-    def __init__(self, websocket):
-        self.websocket = websocket
+    It is created on the event loop and the chain is run in another
+    thread. Tokens are handed to the loop through a bounded queue, which
+    drain() sends to the websocket, so a slow client slows the chain down
+    instead of piling up tokens.
+    """
+
+    def __init__(self, websocket, maxsize: int = 256, **options):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.async_handler = AsyncStreamingLLMCallbackHandler(websocket, **options)
+        self._closed = False
+
+    def _put(self, token: Optional[str]) -> None:
+        # Wait for room in the queue
+        asyncio.run_coroutine_threadsafe(self.queue.put(token), self.loop).result()
 
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        resp = ChatResponse(message=token, type="stream", intermediate_steps="")
+        if not self._closed:
+            self._put(token)
+
+    def close(self) -> None:
+        """Called from the chain's thread once it is done."""
+        if not self._closed:
+            self._put(None)
+
+    async def drain(self) -> None:
+        """Send the tokens from the queue until the chain is done."""
+        try:
+            while True:
+                token = await self.queue.get()
+                if token is None:
+                    break
+                await self.async_handler.on_llm_new_token(token)
+            await self.async_handler.flush()
+        except BaseException:
+            # Stop taking tokens, and unblock the chain if it's waiting
+            self._closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            raise
+
+
+class ThoughtRecorder:
+    """
+    Records the steps of a single run, which replace the verbose output
+    as its thought. Each run gets its own recorder, so concurrent runs
+    don't mix their steps.
+    """
+
+    def __init__(self):
+        self.steps: List[ThoughtStep] = []
+
+    def add_step(self, type: str, text: str) -> None:
+        self.steps.append(ThoughtStep(type=type, text=text))
+
+    def record_chain_start(self, serialized: Dict[str, Any]) -> None:
+        name = (serialized or {}).get("name", "")
+        self.add_step("chain_start", f"> Entering new {name} chain...")
+
+    def record_agent_action(self, action: AgentAction) -> None:
+        self.add_step("agent_action", action.log)
+
+    def record_tool_end(self, output: str) -> None:
+        self.add_step("tool_end", f"Observation: {output}")
+
+    def record_agent_finish(self, finish: AgentFinish) -> None:
+        self.add_step("agent_finish", finish.log)
+
+    def format(self) -> str:
+        return "\n".join(step.text for step in self.steps)
+
+
+class ThoughtCallbackHandler(ThoughtRecorder, BaseCallbackHandler):
+    """Callback handler that records the thought of a sync run."""
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs, **kwargs) -> None:
+        self.record_chain_start(serialized)
+
+    def on_text(self, text: str, **kwargs: Any) -> None:
+        self.add_step("text", text)
+
+    def on_agent_action(self, action: AgentAction, **kwargs: Any) -> None:
+        self.record_agent_action(action)
+
+    def on_tool_end(self, output: str, **kwargs: Any) -> None:
+        self.record_tool_end(output)
+
+    def on_agent_finish(self, finish: AgentFinish, **kwargs: Any) -> None:
+        self.record_agent_finish(finish)
+
+    def on_chain_end(self, outputs, **kwargs: Any) -> None:
+        self.add_step("chain_end", "> Finished chain.")
+
+
+class AsyncThoughtCallbackHandler(ThoughtRecorder, AsyncCallbackHandler):
+    """Callback handler that records the thought of an async run."""
+
+    async def on_chain_start(
+        self, serialized: Dict[str, Any], inputs, **kwargs
+    ) -> None:
+        self.record_chain_start(serialized)
+
+    async def on_text(self, text: str, **kwargs: Any) -> None:
+        self.add_step("text", text)
+
+    async def on_agent_action(self, action: AgentAction, **kwargs: Any) -> None:
+        self.record_agent_action(action)
+
+    async def on_tool_end(self, output: str, **kwargs: Any) -> None:
+        self.record_tool_end(output)
+
+    async def on_agent_finish(self, finish: AgentFinish, **kwargs: Any) -> None:
+        self.record_agent_finish(finish)
 
-        loop = asyncio.get_event_loop()
-        coroutine = self.websocket.send_json(resp.dict())
-        asyncio.run_coroutine_threadsafe(coroutine, loop)
+    async def on_chain_end(self, outputs, **kwargs: Any) -> None:
+        self.add_step("chain_end", "> Finished chain.")
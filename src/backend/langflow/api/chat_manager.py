@@ -1,51 +1,309 @@
 import asyncio
+import contextlib
+import hashlib
 import json
-from collections import defaultdict
-from typing import Dict, List
-
-from fastapi import WebSocket, status
-
-from langflow.api.schemas import ChatMessage, ChatResponse, FileResponse
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Collection, Deque, Dict, List, Optional, Set, Tuple, Union
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from langflow.api.schemas import (
+    ChatMessage,
+    ChatResponse,
+    ChatSession,
+    ChatTurn,
+    FileResponse,
+    StoredFile,
+)
 from langflow.cache import cache_manager
+from langflow.cache.backends import CacheBackend, ConfiguredCache
+from langflow.cache.base import PREFIX
+from langflow.cache.blobs import blob_store
 from langflow.cache.manager import Subject
 from langflow.interface.run import (
+    get_executor,
     get_result_and_steps,
-    load_or_build_langchain_object,
+    load_or_build_session,
+    run_in_executor,
+    save_session_object,
 )
 from langflow.interface.utils import pil_to_base64, try_setting_streaming_options
+from langflow.settings import settings
 from langflow.utils.logger import logger
 
 
 class ChatHistory(Subject):
-    def __init__(self):
+    """
+    The recent turns of each client, in a ring buffer of max_turns.
+
+    A turn is kept as one record with the message of the client and the
+    end response. Start and stream messages aren't kept, and files wait
+    in a buffer until the turn ends. The files of a turn are moved to
+    the blob store, and the record only keeps their digests.
+
+    The sessions are kept in the configured cache backend, so with the
+    shared backend a client can send each message to another worker.
+
+    Turns pushed out of the buffer are appended to a log on disk, and
+    the history of clients that weren't seen for session_ttl seconds is
+    removed.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        session_ttl: Optional[int] = None,
+        directory: Optional[Union[str, Path]] = None,
+        sessions: Optional[CacheBackend] = None,
+    ):
         super().__init__()
-        self.history: Dict[str, List[ChatMessage]] = defaultdict(list)
+        self._max_turns = max_turns
+        self._session_ttl = session_ttl
+        self._directory = Path(directory) if directory is not None else None
+        # Idle sessions are also removed after session_ttl
+        self.sessions = (
+            sessions
+            if sessions is not None
+            else ConfiguredCache("chat_sessions", maxsize=1000)
+        )
+        # The clients this worker saw, whose sessions it checks for expiry
+        self.clients: Set[str] = set()
+        self.pending_files: Dict[str, List[FileResponse]] = {}
+        self._lock = threading.Lock()
+        # Records waiting to be appended to the logs, in order
+        self._spilled: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        self._spill_lock = threading.Lock()
+
+    @property
+    def max_turns(self) -> int:
+        return self._max_turns or settings.chat_history_max_messages
+
+    @property
+    def session_ttl(self) -> int:
+        return self._session_ttl or settings.chat_session_ttl
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is not None:
+            return self._directory
+        if settings.chat_history_dir:
+            return Path(settings.chat_history_dir)
+        return Path(tempfile.gettempdir()) / PREFIX / "chat_history"
+
+    def log_path(self, client_id: str) -> Path:
+        name = hashlib.sha256(client_id.encode("utf-8")).hexdigest()
+        return self.directory / f"{name}.jsonl"
+
+    def get_session(self, client_id: str) -> Optional[ChatSession]:
+        return self.sessions.get(client_id)
 
     def add_message(self, client_id: str, message: ChatMessage):
-        """Add a message to the chat history."""
-
-        self.history[client_id].append(message)
-
-        if not isinstance(message, FileResponse):
-            self.notify()
+        """
+        Add a message to the chat history. A message of the client starts
+        a turn, and the response to it ends the turn.
+        """
+        if isinstance(message, FileResponse):
+            # Sent with the end response of the turn
+            self.pending_files.setdefault(client_id, []).append(message)
+            return
+        if message.type in ["start", "stream"]:
+            return
+
+        files: List[StoredFile] = []
+        if message.is_bot:
+            # Before taking the lock, as the files are written to disk
+            files = [self._store_file(file) for file in getattr(message, "files", [])]
+        with self._lock:
+            session = self.get_session(client_id) or ChatSession()
+            open_message = session.open_message
+            session.open_message = None
+            turn: Optional[ChatTurn] = None
+            if message.is_bot:
+                turn = ChatTurn(
+                    message=open_message.message if open_message else None,
+                    response=message.message,
+                    intermediate_steps=getattr(message, "intermediate_steps", ""),
+                    files=files,
+                )
+            else:
+                if open_message is not None:
+                    # A turn that never got a response is kept without one
+                    turn = ChatTurn(message=open_message.message)
+                session.open_message = message
+            spilled = False
+            if turn is not None:
+                session.turns.append(turn)
+                while len(session.turns) > self.max_turns:
+                    self._spilled.append((client_id, session.turns.pop(0).dict()))
+                    spilled = True
+            session.last_seen = time.time()
+            self.sessions.set(client_id, session)
+            self.clients.add(client_id)
+
+        if spilled:
+            self._write_spilled_later()
+        self.notify()
+
+    def take_files(self, client_id: str) -> List[FileResponse]:
+        """Get the files made during the current turn, and start a new one."""
+        return self.pending_files.pop(client_id, [])
+
+    def has_turns(self, client_id: str) -> bool:
+        """
+        Check if a client finished a turn since its history was emptied,
+        on any worker.
+        """
+        return bool(self.get_turns(client_id))
+
+    def get_turns(self, client_id: str) -> List[ChatTurn]:
+        """Get the finished turns of a client, oldest first."""
+        session = self.get_session(client_id)
+        return list(session.turns) if session is not None else []
 
     def get_history(self, client_id: str, filter_messages=True) -> List[ChatMessage]:
-        """Get the chat history for a client."""
-        if history := self.history.get(client_id, []):
-            if filter_messages:
-                return [msg for msg in history if msg.type not in ["start", "stream"]]
-            return history
-        else:
+        """
+        Get the chat history for a client, as the messages of the client
+        and the end responses. Start and stream messages are never kept,
+        so filter_messages is only kept for compatibility.
+        """
+        session = self.get_session(client_id)
+        if session is None:
+            return []
+        messages: List[ChatMessage] = []
+        for turn in session.turns:
+            messages.append(ChatMessage(message=turn.message))
+            messages.append(
+                ChatResponse(
+                    message=turn.response,
+                    type="end",
+                    intermediate_steps=turn.intermediate_steps,
+                    files=self._load_files(turn.files),
+                )
+            )
+        if session.open_message is not None:
+            messages.append(session.open_message)
+        return messages
+
+    def get_spilled(self, client_id: str) -> List[Dict[str, Any]]:
+        """Get the turns of a client that were moved to disk, oldest first."""
+        self.write_spilled()
+        path = self.log_path(client_id)
+        if not path.exists():
             return []
+        with path.open("r", encoding="utf-8") as log_file:
+            return [json.loads(line) for line in log_file if line.strip()]
 
     def empty_history(self, client_id: str):
         """Empty the chat history for a client."""
-        self.history[client_id] = []
+        with self._lock:
+            self._empty_history(client_id)
+
+    def _empty_history(self, client_id: str):
+        self.sessions.pop(client_id)
+        self.clients.discard(client_id)
+        self.pending_files.pop(client_id, None)
+        with self._spill_lock:
+            self._spilled = deque(
+                (spilled_id, record)
+                for spilled_id, record in self._spilled
+                if spilled_id != client_id
+            )
+            with contextlib.suppress(OSError):
+                self.log_path(client_id).unlink()
+
+    def touch(self, client_id: str, seen_at: Optional[float] = None):
+        """Mark the session of a client as seen, if it has one."""
+        with self._lock:
+            self._touch(client_id, seen_at)
+
+    def _touch(self, client_id: str, seen_at: Optional[float] = None):
+        session = self.get_session(client_id)
+        if session is not None:
+            session.last_seen = time.time() if seen_at is None else seen_at
+            self.sessions.set(client_id, session)
+            self.clients.add(client_id)
+
+    def expire_idle_sessions(self, active: Collection[str] = ()) -> List[str]:
+        """
+        Remove the history of the clients this worker saw that are idle
+        on every worker. Returns their ids.
+        """
+        # Under the lock, so that a client seen meanwhile isn't removed
+        with self._lock:
+            # Other workers only know when these were last seen
+            for client_id in active:
+                self._touch(client_id)
+            deadline = time.time() - self.session_ttl
+            expired = []
+            for client_id in list(self.clients):
+                session = self.get_session(client_id)
+                if session is None:
+                    # Removed by another worker
+                    self.clients.discard(client_id)
+                elif session.last_seen < deadline:
+                    logger.debug(f"Expiring chat history of {client_id}")
+                    self._empty_history(client_id)
+                    expired.append(client_id)
+        return expired
+
+    def write_spilled(self):
+        """Append the messages pushed out of the buffers to their logs."""
+        with self._spill_lock:
+            while self._spilled:
+                client_id, record = self._spilled.popleft()
+                try:
+                    path = self.log_path(client_id)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with path.open("a", encoding="utf-8") as log_file:
+                        log_file.write(json.dumps(record, default=str) + "\n")
+                except OSError as exc:
+                    logger.warning(f"Could not save chat message to disk: {exc}")
+
+    def _write_spilled_later(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not called from the event loop, so it can block
+            self.write_spilled()
+            return
+        loop.run_in_executor(get_executor(), self.write_spilled)
+
+    @staticmethod
+    def _store_file(file: FileResponse) -> StoredFile:
+        data = file.data
+        if not isinstance(data, str):
+            if file.data_type == "image":
+                data = pil_to_base64(data)
+            elif hasattr(data, "to_csv"):
+                data = data.to_csv()
+            else:
+                data = str(data)
+        digest = blob_store.put(data.encode("utf-8"), f"chat_file.{file.data_type}")
+        return StoredFile(data_type=file.data_type, digest=digest)
+
+    @staticmethod
+    def _load_files(files: List[StoredFile]) -> List[FileResponse]:
+        loaded = []
+        for file in files:
+            try:
+                data = blob_store.get_path(file.digest).read_text(encoding="utf-8")
+            except (ValueError, OSError):
+                logger.debug(f"File {file.digest} of a chat turn was evicted")
+                continue
+            loaded.append(
+                FileResponse(message=None, data=data, data_type=file.data_type)
+            )
+        return loaded
 
 
 class ChatManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.active_turns: Dict[str, asyncio.Task] = {}
         self.chat_history = ChatHistory()
         self.cache_manager = cache_manager
         self.cache_manager.attach(self.update)
@@ -90,9 +348,31 @@ class ChatManager:
     async def connect(self, client_id: str, websocket: WebSocket):
         await websocket.accept()
         self.active_connections[client_id] = websocket
+        self.chat_history.touch(client_id)
 
-    def disconnect(self, client_id: str):
-        self.active_connections.pop(client_id, None)
+    async def expire_sessions(self, interval: Optional[float] = None):
+        """Remove the history of idle clients every interval seconds."""
+        while True:
+            # Sessions are removed at most a quarter of the ttl late
+            await asyncio.sleep(interval or self.chat_history.session_ttl / 4)
+            try:
+                await run_in_executor(
+                    self.chat_history.expire_idle_sessions,
+                    list(self.active_connections),
+                )
+            except Exception as exc:
+                logger.exception(exc)
+
+    def disconnect(self, client_id: str, websocket: Optional[WebSocket] = None):
+        # A client that reconnected already replaced its old connection
+        if (
+            websocket is not None
+            and self.active_connections.get(client_id) is not websocket
+        ):
+            return
+        if self.active_connections.pop(client_id, None) is not None:
+            # The session expires once the client is idle for long enough
+            self.chat_history.touch(client_id)
 
     async def send_message(self, client_id: str, message: str):
         websocket = self.active_connections[client_id]
@@ -112,12 +392,13 @@ class ChatManager:
         start_resp = ChatResponse(message=None, type="start", intermediate_steps="")
         await self.send_json(client_id, start_resp)
 
-        is_first_message = len(self.chat_history.get_history(client_id=client_id)) <= 1
+        is_first_message = not self.chat_history.has_turns(client_id)
         # Generate result and thought
         try:
             logger.debug("Generating result and thought")
 
             result, intermediate_steps = await process_graph(
+                client_id=client_id,
                 graph_data=graph_data,
                 is_first_message=is_first_message,
                 chat_message=chat_message,
@@ -130,18 +411,11 @@ class ChatManager:
             raise e
         # Send a response back to the frontend, if needed
         intermediate_steps = intermediate_steps or ""
-        history = self.chat_history.get_history(client_id, filter_messages=False)
-        file_responses = []
-        if history:
-            # Iterate backwards through the history
-            for msg in reversed(history):
-                if isinstance(msg, FileResponse):
-                    if msg.data_type == "image":
-                        # Base64 encode the image
-                        msg.data = pil_to_base64(msg.data)
-                    file_responses.append(msg)
-                if msg.type == "start":
-                    break
+        file_responses = self.chat_history.take_files(client_id)
+        for msg in file_responses:
+            if msg.data_type == "image":
+                # Base64 encode the image
+                msg.data = pil_to_base64(msg.data)
 
         response = ChatResponse(
             message=result,
@@ -149,11 +423,71 @@ class ChatManager:
             type="end",
             files=file_responses,
         )
+        # The files of the turn are written to the blob store
+        await run_in_executor(self.chat_history.add_message, client_id, response)
         await self.send_json(client_id, response)
-        self.chat_history.add_message(client_id, response)
+
+    async def process_turn(self, client_id: str, payload: Dict):
+        with self.cache_manager.set_client_id(client_id):
+            await self.process_message(client_id, payload)
+
+    def cancel_turn(self, client_id: str) -> bool:
+        """Cancel the turn that is running for a client, if any."""
+        turn = self.active_turns.get(client_id)
+        if turn is None or turn.done():
+            return False
+        turn.cancel()
+        return True
+
+    async def run_turns(self, client_id: str, turns: asyncio.Queue):
+        """Process the queued messages of a client, one turn at a time."""
+        while True:
+            payload = await turns.get()
+            # A turn of a previous connection may still be running
+            previous = self.active_turns.get(client_id)
+            if previous is not None and not previous.done():
+                await asyncio.wait({previous})
+            # Drop the files of cancelled turns
+            self.chat_history.take_files(client_id)
+
+            turn = asyncio.create_task(self.process_turn(client_id, payload))
+            self.active_turns[client_id] = turn
+            try:
+                await asyncio.wait({turn})
+            finally:
+                # Stops the turn if the client disconnected
+                turn.cancel()
+
+            if turn.cancelled():
+                logger.debug(f"Cancelled turn of {client_id}")
+                self.chat_history.take_files(client_id)
+                response = ChatResponse(message=None, type="end", intermediate_steps="")
+                await self.send_json(client_id, response)
+                self.chat_history.add_message(client_id, response)
+            else:
+                turn.result()
+
+    async def receive_messages(
+        self, client_id: str, websocket: WebSocket, turns: asyncio.Queue
+    ):
+        """Queue the messages of a client, and handle the control messages right away."""
+        while True:
+            json_payload = await websocket.receive_json()
+            try:
+                payload = json.loads(json_payload)
+            except TypeError:
+                payload = json_payload
+            if "clear_history" in payload:
+                self.chat_history.empty_history(client_id)
+                continue
+            if "cancel" in payload:
+                self.cancel_turn(client_id)
+                continue
+            turns.put_nowait(payload)
 
     async def handle_websocket(self, client_id: str, websocket: WebSocket):
         await self.connect(client_id, websocket)
+        tasks: List[asyncio.Task] = []
 
         try:
             chat_history = self.chat_history.get_history(client_id)
@@ -161,45 +495,51 @@ class ChatManager:
             chat_history = [chat.dict() for chat in chat_history]
             await websocket.send_json(chat_history)
 
-            while True:
-                json_payload = await websocket.receive_json()
-                try:
-                    payload = json.loads(json_payload)
-                except TypeError:
-                    payload = json_payload
-                if "clear_history" in payload:
-                    self.chat_history.history[client_id] = []
-                    continue
-
-                with self.cache_manager.set_client_id(client_id):
-                    await self.process_message(client_id, payload)
-
+            # Messages are read while a turn runs, so that it can be cancelled
+            turns: asyncio.Queue = asyncio.Queue()
+            tasks = [
+                asyncio.create_task(self.receive_messages(client_id, websocket, turns)),
+                asyncio.create_task(self.run_turns(client_id, turns)),
+            ]
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+
+        except WebSocketDisconnect:
+            logger.debug(f"Client {client_id} disconnected")
+            self.disconnect(client_id, websocket)
         except Exception as e:
             # Handle any exceptions that might occur
             logger.exception(e)
             # send a message to the client
-            await self.active_connections[client_id].close(
+            await websocket.close(
                 code=status.WS_1011_INTERNAL_ERROR, reason=str(e)[:120]
             )
-            self.disconnect(client_id)
+            self.disconnect(client_id, websocket)
         finally:
+            # Stop the running turn, so that a client that left doesn't
+            # keep using the LLM
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             try:
-                connection = self.active_connections.get(client_id)
-                if connection:
-                    await connection.close(code=1000, reason="Client disconnected")
-                    self.disconnect(client_id)
+                if self.active_connections.get(client_id) is websocket:
+                    await websocket.close(code=1000, reason="Client disconnected")
             except Exception as e:
                 logger.exception(e)
-            self.disconnect(client_id)
+            self.disconnect(client_id, websocket)
 
 
 async def process_graph(
+    client_id: str,
     graph_data: Dict,
     is_first_message: bool,
     chat_message: ChatMessage,
     websocket: WebSocket,
 ):
-    langchain_object = load_or_build_langchain_object(graph_data, is_first_message)
+    flow_hash, langchain_object = await run_in_executor(
+        load_or_build_session, client_id, graph_data, is_first_message
+    )
     langchain_object = try_setting_streaming_options(langchain_object, websocket)
     logger.debug("Loaded langchain object")
 
@@ -216,6 +556,7 @@ async def process_graph(
             langchain_object, chat_message.message or "", websocket=websocket
         )
         logger.debug("Generated result and intermediate_steps")
+        save_session_object(client_id, flow_hash, langchain_object)
         return result, intermediate_steps
     except Exception as e:
         # Log stack trace
@@ -1,16 +1,36 @@
+import json
 import logging
 from importlib.metadata import version
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
 from langflow.api.schemas import (
+    BatchPredictRequest,
+    BatchPredictResponse,
+    BatchPredictResult,
     ExportedFlow,
+    FlowPredictRequest,
     GraphData,
     PredictRequest,
     PredictResponse,
+    RegisteredFlowResponse,
+    UploadRequest,
+    UploadResponse,
 )
-from langflow.interface.run import process_graph_cached
-from langflow.interface.types import build_langchain_types_dict
+from langflow.cache.base import get_cache_stats
+from langflow.cache.blobs import blob_store
+from langflow.interface.catalog import component_catalog
+from langflow.interface.flows import flow_registry
+from langflow.interface.run import (
+    aload_langchain_object,
+    aprocess_graph_batch,
+    aprocess_graph_cached,
+    aprocess_registered_flow,
+    astream_result,
+    run_in_executor,
+)
+from langflow.settings import settings
 
 # build router
 router = APIRouter()
@@ -18,8 +38,14 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/all")
-def get_all():
-    return build_langchain_types_dict()
+def get_all(request: Request):
+    catalog = component_catalog.get()
+    headers = {"ETag": catalog.etag}
+    if catalog.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=catalog.body, media_type="application/json", headers=headers
+    )
 
 
 @router.post("/predict", response_model=PredictResponse)
@@ -28,7 +54,7 @@ async def get_load(predict_request: PredictRequest):
         exported_flow: ExportedFlow = predict_request.exported_flow
         graph_data: GraphData = exported_flow.data
         data = graph_data.dict()
-        response = process_graph_cached(data, predict_request.message)
+        response = await aprocess_graph_cached(data, predict_request.message)
         return PredictResponse(result=response.get("result", ""))
     except Exception as e:
         # Log stack trace
@@ -36,6 +62,133 @@ async def get_load(predict_request: PredictRequest):
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@router.post("/upload", response_model=UploadResponse)
+def upload_file(upload_request: UploadRequest):
+    try:
+        digest = blob_store.put_encoded(
+            upload_request.content, upload_request.file_name
+        )
+        path = blob_store.get_path(digest, upload_request.file_name)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return UploadResponse(
+        file_name=path.name,
+        hash=digest,
+        reference=blob_store.reference(digest),
+        size=path.stat().st_size,
+    )
+
+
+def to_event_stream(responses):
+    """Send each response as a server-sent event."""
+
+    async def events():
+        async for response in responses:
+            # Stream frames are sent already encoded
+            data = response if isinstance(response, str) else json.dumps(response)
+            yield f"data: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/predict/stream")
+async def predict_stream(predict_request: PredictRequest):
+    try:
+        langchain_object = await aload_langchain_object(
+            predict_request.exported_flow.data.dict()
+        )
+    except Exception as e:
+        logger.exception(e)
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    return to_event_stream(astream_result(langchain_object, predict_request.message))
+
+
+@router.post("/predict/batch", response_model=BatchPredictResponse)
+async def predict_batch(batch_request: BatchPredictRequest):
+    data = batch_request.exported_flow.data.dict()
+    concurrency = min(
+        batch_request.concurrency or settings.batch_concurrency,
+        settings.batch_concurrency,
+    )
+    results = aprocess_graph_batch(data, batch_request.messages, concurrency)
+
+    def to_result(index, response) -> BatchPredictResult:
+        return BatchPredictResult(
+            index=index, result=response.get("result"), error=response.get("error")
+        )
+
+    if batch_request.stream:
+
+        async def stream_results():
+            try:
+                async for index, response in results:
+                    yield to_result(index, response).json() + "\n"
+            except Exception as exc:
+                logger.exception(exc)
+                yield json.dumps({"error": str(exc)}) + "\n"
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    try:
+        ordered = sorted(
+            [to_result(index, response) async for index, response in results],
+            key=lambda result: result.index,
+        )
+    except Exception as e:
+        logger.exception(e)
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    return BatchPredictResponse(results=ordered)
+
+
+@router.post("/flows", response_model=RegisteredFlowResponse)
+async def register_flow(exported_flow: ExportedFlow):
+    try:
+        flow_hash = await run_in_executor(
+            flow_registry.register, exported_flow.id, exported_flow.data.dict()
+        )
+    except Exception as e:
+        logger.exception(e)
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return RegisteredFlowResponse(
+        id=exported_flow.id, name=exported_flow.name, hash=flow_hash
+    )
+
+
+@router.delete("/flows/{flow_id}")
+def unregister_flow(flow_id: str):
+    if not flow_registry.remove(flow_id):
+        raise HTTPException(status_code=404, detail=f"Flow {flow_id} not found")
+    return {"id": flow_id}
+
+
+@router.post("/flows/{flow_id}/predict", response_model=PredictResponse)
+async def predict_flow(flow_id: str, predict_request: FlowPredictRequest):
+    if flow_id not in flow_registry:
+        raise HTTPException(status_code=404, detail=f"Flow {flow_id} not found")
+    try:
+        response = await aprocess_registered_flow(flow_id, predict_request.message)
+        return PredictResponse(result=response.get("result", ""))
+    except Exception as e:
+        logger.exception(e)
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@router.post("/flows/{flow_id}/predict/stream")
+async def predict_flow_stream(flow_id: str, predict_request: FlowPredictRequest):
+    if flow_id not in flow_registry:
+        raise HTTPException(status_code=404, detail=f"Flow {flow_id} not found")
+    try:
+        langchain_object = await run_in_executor(flow_registry.get_object, flow_id)
+    except Exception as e:
+        logger.exception(e)
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    return to_event_stream(astream_result(langchain_object, predict_request.message))
+
+
 # get endpoint to return version of langflow
 @router.get("/version")
 def get_version():
@@ -45,3 +198,8 @@ def get_version():
 @router.get("/health")
 def get_health():
     return {"status": "OK"}
+
+
+@router.get("/cache/stats")
+def get_cache_stats_endpoint():
+    return get_cache_stats()
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel, validator
 
@@ -32,6 +32,53 @@ class PredictResponse(BaseModel):
     result: str
 
 
+class FlowPredictRequest(BaseModel):
+    """Predict request schema for a registered flow."""
+
+    message: str
+
+
+class RegisteredFlowResponse(BaseModel):
+    """Registered flow schema."""
+
+    id: str
+    name: str
+    hash: str
+
+
+class BatchPredictRequest(BaseModel):
+    """Batch predict request schema."""
+
+    messages: List[str]
+    exported_flow: ExportedFlow
+    # Maximum number of messages processed at the same time,
+    # limited by the batch_concurrency setting
+    concurrency: Optional[int] = None
+    # Stream each result as newline delimited JSON as soon as it's ready
+    stream: bool = False
+
+
+class BatchPredictResult(BaseModel):
+    """Result of one message of a batch."""
+
+    index: int
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchPredictResponse(BaseModel):
+    """Batch predict response schema."""
+
+    results: List[BatchPredictResult]
+
+
+class ThoughtStep(BaseModel):
+    """A step taken by a chain or agent while generating a result."""
+
+    type: str
+    text: str
+
+
 class ChatMessage(BaseModel):
     """Chat message schema."""
 
@@ -68,3 +115,47 @@ class FileResponse(ChatMessage):
         if v not in ["image", "csv"]:
             raise ValueError("data_type must be image or csv")
         return v
+
+
+class StoredFile(BaseModel):
+    """A file of a chat turn, kept in the blob store."""
+
+    data_type: str
+    digest: str
+
+
+class ChatTurn(BaseModel):
+    """A message of the client and the response to it, as kept in the history."""
+
+    message: Optional[str] = None
+    response: Optional[str] = None
+    intermediate_steps: str = ""
+    files: List[StoredFile] = []
+
+
+class ChatSession(BaseModel):
+    """The chat history of a client, as kept in the cache backend."""
+
+    turns: List[ChatTurn] = []
+    # The message of the turn that is running, if any
+    open_message: Optional[ChatMessage] = None
+    # Wall clock time, so that every worker can compare it
+    last_seen: float = 0.0
+
+
+class UploadRequest(BaseModel):
+    """Upload request schema."""
+
+    file_name: str
+    # The file encoded in base64, optionally as a data URL
+    content: str
+
+
+class UploadResponse(BaseModel):
+    """Upload response schema."""
+
+    file_name: str
+    hash: str
+    # What to send as the content of a file field instead of the file itself
+    reference: str
+    size: int
@@ -0,0 +1,252 @@
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from langflow.cache.base import NAMED_CACHES, PREFIX, LRUCache, compute_dict_hash
+from langflow.cache.disk import DiskCache
+from langflow.settings import settings
+from langflow.utils.logger import logger
+
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Where built objects and chat state are kept."""
+
+    @abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value, or the default if it isn't cached."""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache a value."""
+
+    @abstractmethod
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a value and return it."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every value."""
+
+    @abstractmethod
+    def __contains__(self, key: Hashable) -> bool:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self)}
+
+
+class InMemoryCache(CacheBackend):
+    """Keeps objects in this process, in an LRU cache."""
+
+    def __init__(self, maxsize: int = 128, name: Optional[str] = None, **options):
+        self.cache = LRUCache(maxsize=maxsize, name=name, **options)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.cache.get(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.cache.set(key, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self.cache.pop(key, default)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.cache
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+def get_shared_cache_dir() -> Path:
+    """Get the folder the shared backend keeps its objects in."""
+    if settings.shared_cache_dir:
+        return Path(settings.shared_cache_dir)
+    # Prefer shared memory, so that workers don't wait on the disk
+    shm = Path("/dev/shm")
+    if shm.is_dir():
+        return shm / PREFIX
+    return Path(tempfile.gettempdir()) / PREFIX / "shared"
+
+
+def _canonical(value: Any) -> Any:
+    # Sets and tuples as lists, with sets sorted, so that the same key
+    # is written the same way in every process
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(item) for item in value), key=repr)
+    if isinstance(value, (tuple, list)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+class SharedCache(CacheBackend):
+    """
+    Keeps pickled objects in a folder that every worker on the machine
+    reads from, so an object built by one worker is reused by the others.
+
+    Objects that can't be pickled are kept in memory instead, and are
+    only seen by the worker that built them. on_remove is only called for
+    the entries this worker pops, as the others are evicted by any worker.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        directory: Optional[Path] = None,
+        maxsize: int = 128,
+        on_remove: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.namespace = namespace
+        self.on_remove = on_remove
+        self.disk_cache = DiskCache(
+            directory=(directory or get_shared_cache_dir()) / namespace,
+            max_entries=maxsize,
+        )
+        self.local_cache = InMemoryCache(maxsize=maxsize)
+
+    def _key(self, key: Hashable) -> str:
+        return compute_dict_hash({"key": _canonical(key)})
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        key = self._key(key)
+        value = self.disk_cache.get(key, _MISSING)
+        if value is _MISSING:
+            return self.local_cache.get(key, default)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        key = self._key(key)
+        try:
+            self.disk_cache.set(key, value)
+        except Exception as exc:
+            logger.warning(
+                f"Could not share {type(value).__name__}, keeping it in this worker: {exc}"
+            )
+            self.disk_cache.delete(key)
+            self.local_cache.set(key, value)
+        else:
+            self.local_cache.pop(key)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self.get(key, _MISSING)
+        hashed_key = self._key(key)
+        self.disk_cache.delete(hashed_key)
+        self.local_cache.pop(hashed_key)
+        if value is _MISSING:
+            return default
+        if self.on_remove is not None:
+            self.on_remove(key, value)
+        return value
+
+    def clear(self) -> None:
+        self.disk_cache.clear()
+        self.local_cache.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        key = self._key(key)
+        return key in self.disk_cache or key in self.local_cache
+
+    def __len__(self) -> int:
+        return len(self.disk_cache) + len(self.local_cache)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.namespace,
+            "size": len(self),
+            "local_size": len(self.local_cache),
+            "directory": str(self.disk_cache.directory),
+        }
+
+
+CACHE_BACKENDS = ("memory", "shared")
+
+
+class ConfiguredCache(CacheBackend):
+    """
+    Uses the backend chosen by the cache_backend setting. The backend is
+    created on first use, so settings loaded after import are respected.
+    on_remove is given to the backend, for the entries that are removed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 128,
+        on_remove: Optional[Callable[[Hashable, Any], None]] = None,
+        **memory_options,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.on_remove = on_remove
+        self.memory_options = memory_options
+        self._backends: Dict[str, CacheBackend] = {}
+        self._lock = threading.Lock()
+        NAMED_CACHES[name] = self
+
+    @property
+    def backend(self) -> CacheBackend:
+        backend_name = settings.cache_backend
+        backend = self._backends.get(backend_name)
+        if backend is not None:
+            return backend
+        with self._lock:
+            if backend_name not in self._backends:
+                self._backends[backend_name] = self._create(backend_name)
+            return self._backends[backend_name]
+
+    def _create(self, backend_name: str) -> CacheBackend:
+        if backend_name == "shared":
+            return SharedCache(
+                namespace=self.name, maxsize=self.maxsize, on_remove=self.on_remove
+            )
+        if backend_name == "memory":
+            return InMemoryCache(
+                maxsize=self.maxsize, on_remove=self.on_remove, **self.memory_options
+            )
+        raise ValueError(
+            f"Unknown cache backend {backend_name}. "
+            f"Use one of {', '.join(CACHE_BACKENDS)}"
+        )
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.backend.get(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.backend.set(key, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self.backend.pop(key, default)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.backend
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.backend.stats(),
+            "name": self.name,
+            "backend": settings.cache_backend,
+        }
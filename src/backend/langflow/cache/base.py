@@ -1,18 +1,23 @@
-import base64
-import contextlib
 import functools
 import hashlib
 import json
 import os
+import sys
 import tempfile
+import threading
+import time
 from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
 
 import dill  # type: ignore
 
+
 CACHE: Dict[str, Any] = {}
 
+# Every cache created with a name, so their stats can be reported
+NAMED_CACHES: Dict[str, Any] = {}
+
 
 def create_cache_folder(func):
     def wrapper(*args, **kwargs):
@@ -27,27 +32,223 @@ def create_cache_folder(func):
     return wrapper
 
 
-def memoize_dict(maxsize=128):
-    cache = OrderedDict()
+def _shallow_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            sys.getsizeof(key) + sys.getsizeof(item) for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+def approximate_size(value: Any) -> int:
+    """
+    Estimate how many bytes a value takes by the length of its pickle, so
+    that the objects it references are counted. Values that can't be
+    pickled are only measured one level into containers.
+    """
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    try:
+        return len(dill.dumps(value))
+    except Exception:
+        return _shallow_size(value)
+
+
+class _CacheEntry(NamedTuple):
+    value: Any
+    expires_at: Optional[float]
+    size: int
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread safe least recently used cache.
+
+    Entries can expire after ttl seconds, and the cache can be bounded
+    both by number of entries (maxsize) and by their estimated size in
+    bytes (max_bytes). Hits, misses, evictions and expirations are counted
+    and reported by stats().
+
+    on_remove is called with the key and value of each entry that is
+    evicted, expires, is popped or cleared, but not when it's replaced.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = approximate_size,
+        name: Optional[str] = None,
+        on_remove: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.name = name
+        self.on_remove = on_remove
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if name is not None:
+            NAMED_CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if self._is_expired(entry):
+                self._discard(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        # Only measure values when there is a limit to enforce
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            return self._discard(key).value
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "maxsize": self.maxsize,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+    def _is_expired(self, entry: _CacheEntry) -> bool:
+        return entry.expires_at is not None and entry.expires_at <= time.monotonic()
+
+    def _remove(self, key: Hashable) -> _CacheEntry:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        return entry
+
+    def _discard(self, key: Hashable) -> _CacheEntry:
+        # Removes an entry for good, unlike replacing it
+        entry = self._remove(key)
+        if self.on_remove is not None:
+            self.on_remove(key, entry.value)
+        return entry
+
+    def _evict(self) -> None:
+        # Drop expired entries first, then the least recently used ones.
+        # The newest entry is always kept, even if it is over max_bytes alone
+        if self.ttl is not None:
+            for key in [k for k, e in self._entries.items() if self._is_expired(e)]:
+                self._discard(key)
+                self.expirations += 1
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.maxsize
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get the stats of every named cache."""
+    return {name: cache.stats() for name, cache in NAMED_CACHES.items()}
+
+
+def memoize_dict(
+    maxsize: int = 128,
+    ttl: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    cache=None,
+):
+    """
+    Memoize a function by the hash of the dict it takes as first argument.
+
+    The results are kept in an LRUCache, unless another cache with the
+    same get, set, pop and clear methods is given.
+    """
 
     def decorator(func):
+        nonlocal cache
+        if cache is None:
+            cache = LRUCache(
+                maxsize=maxsize, ttl=ttl, max_bytes=max_bytes, name=func.__name__
+            )
+
+        def make_key(*args, **kwargs):
+            hashed = compute_dict_hash(args[0])
+            return (func.__name__, hashed, frozenset(kwargs.items()))
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            hashed = compute_dict_hash(args[0])
-            key = (func.__name__, hashed, frozenset(kwargs.items()))
-            if key not in cache:
+            key = make_key(*args, **kwargs)
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                # Concurrent misses may build the same object twice,
+                # but the lock is not held while building
                 result = func(*args, **kwargs)
-                cache[key] = result
-                if len(cache) > maxsize:
-                    cache.popitem(last=False)
-            else:
-                result = cache[key]
+                cache.set(key, result)
             return result
 
         def clear_cache():
             cache.clear()
 
+        def evict(*args, **kwargs):
+            """Remove the result for these arguments only."""
+            cache.pop(make_key(*args, **kwargs))
+
         wrapper.clear_cache = clear_cache  # type: ignore
+        wrapper.evict = evict  # type: ignore
         wrapper.cache = cache  # type: ignore
         return wrapper
 
@@ -57,98 +258,134 @@ def memoize_dict(maxsize=128):
 PREFIX = "langflow_cache"
 
 
-@create_cache_folder
-def clear_old_cache_files(max_cache_size: int = 3):
-    cache_dir = Path(tempfile.gettempdir()) / PREFIX
-    cache_files = list(cache_dir.glob("*.dill"))
+def _release_built_object_blobs(key, value):
+    from langflow.cache.blobs import blob_store
 
-    if len(cache_files) > max_cache_size:
-        cache_files_sorted_by_mtime = sorted(
-            cache_files, key=lambda x: x.stat().st_mtime, reverse=True
-        )
+    blob_store.release(("built_objects", key))
 
-        for cache_file in cache_files_sorted_by_mtime[max_cache_size:]:
-            with contextlib.suppress(OSError):
-                os.remove(cache_file)
 
+# Objects such as vector stores and loaded documents, keyed by the
+# hash of the subgraph that built them. They keep the files they were
+# built from in the blob store
+built_object_cache = LRUCache(
+    maxsize=32, name="built_objects", on_remove=_release_built_object_blobs
+)
 
-def compute_dict_hash(graph_data):
-    graph_data = filter_json(graph_data)
 
-    cleaned_graph_json = json.dumps(graph_data, sort_keys=True)
-    return hashlib.sha256(cleaned_graph_json.encode("utf-8")).hexdigest()
+# Keys that don't change what a flow builds, such as where its nodes are drawn
+FLOW_IGNORED_KEYS = {"viewport", "chatHistory", "flow_hash"}
+NODE_IGNORED_KEYS = {"position", "positionAbsolute", "selected", "dragging"}
+# File contents longer than this are hashed on their own instead of serialized
+LARGE_CONTENT_SIZE = 4096
 
 
-def filter_json(json_data):
-    filtered_data = json_data.copy()
+def _dumps(value) -> bytes:
+    return json.dumps(value, sort_keys=True).encode("utf-8")
 
-    # Remove 'viewport' and 'chatHistory' keys
-    if "viewport" in filtered_data:
-        del filtered_data["viewport"]
-    if "chatHistory" in filtered_data:
-        del filtered_data["chatHistory"]
 
-    # Filter nodes
-    if "nodes" in filtered_data:
-        for node in filtered_data["nodes"]:
-            if "position" in node:
-                del node["position"]
-            if "positionAbsolute" in node:
-                del node["positionAbsolute"]
-            if "selected" in node:
-                del node["selected"]
-            if "dragging" in node:
-                del node["dragging"]
+def _node_for_hash(node):
+    """
+    Get a node without its ignored keys and with large file contents
+    replaced by their digest. The node itself is never modified.
+    """
+    if not isinstance(node, dict):
+        return node
+    node = {key: value for key, value in node.items() if key not in NODE_IGNORED_KEYS}
+    try:
+        template = node["data"]["node"]["template"]
+        files = {
+            name: field
+            for name, field in template.items()
+            if isinstance(field, dict)
+            and field.get("type") == "file"
+            and isinstance(field.get("content"), str)
+            and len(field["content"]) > LARGE_CONTENT_SIZE
+        }
+    except (KeyError, TypeError, AttributeError):
+        return node
+    if not files:
+        return node
+
+    # Copy only the dicts on the way to the file fields
+    template = dict(template)
+    for name, field in files.items():
+        digest = hashlib.sha256(field["content"].encode("utf-8")).hexdigest()
+        template[name] = {**field, "content": f"sha256:{digest}"}
+    node["data"] = {
+        **node["data"],
+        "node": {**node["data"]["node"], "template": template},
+    }
+    return node
+
+
+def compute_dict_hash(graph_data) -> str:
+    """
+    Hash a flow the same way regardless of key order or where its nodes are drawn.
+
+    Nodes are hashed one at a time, so the whole flow is never serialized
+    at once, and the flow passed in is left unchanged.
+    """
+    hasher = hashlib.sha256()
+    for key in sorted(graph_data):
+        if key in FLOW_IGNORED_KEYS:
+            continue
+        value = graph_data[key]
+        hasher.update(_dumps(key) + b":")
+        if key == "nodes" and isinstance(value, list):
+            hasher.update(b"[")
+            for node in value:
+                hasher.update(_dumps(_node_for_hash(node)) + b",")
+            hasher.update(b"]")
+        else:
+            hasher.update(_dumps(value))
+        hasher.update(b",")
+    return hasher.hexdigest()
 
+
+def filter_json(json_data):
+    """Get a copy of the flow without the keys that don't change what it builds."""
+    filtered_data = {
+        key: value for key, value in json_data.items() if key not in FLOW_IGNORED_KEYS
+    }
+    if "nodes" in filtered_data:
+        filtered_data["nodes"] = [
+            {key: value for key, value in node.items() if key not in NODE_IGNORED_KEYS}
+            for node in filtered_data["nodes"]
+        ]
     return filtered_data
 
 
-@create_cache_folder
 def save_binary_file(content: str, file_name: str, accepted_types: list[str]) -> str:
     """
-    Save a binary file to the specified folder.
+    Save a binary file to the blob store.
 
     Args:
-        content: The content of the file as a bytes object.
+        content: The content of the file encoded in base64, or a reference
+            to a file that was already uploaded (blob:<sha256>).
         file_name: The name of the file, including its extension.
 
     Returns:
         The path to the saved file.
     """
+    from langflow.cache.blobs import blob_store
+
     if not any(file_name.endswith(suffix) for suffix in accepted_types):
         raise ValueError(f"File {file_name} is not accepted")
 
-    # Get the destination folder
-    cache_path = Path(tempfile.gettempdir()) / PREFIX
     if not content:
         raise ValueError("Please, reload the file in the loader.")
-    data = content.split(",")[1]
-    decoded_bytes = base64.b64decode(data)
-
-    # Create the full file path
-    file_path = os.path.join(cache_path, file_name)
 
-    # Save the binary content to the file
-    with open(file_path, "wb") as file:
-        file.write(decoded_bytes)
+    return str(blob_store.resolve(content, file_name))
 
-    return file_path
 
+def save_cache(hash_val: str, chat_data):
+    """Save an object to the disk cache, which evicts old entries by itself."""
+    from langflow.cache.disk import disk_cache
 
-@create_cache_folder
-def save_cache(hash_val: str, chat_data, clean_old_cache_files: bool):
-    cache_path = Path(tempfile.gettempdir()) / PREFIX / f"{hash_val}.dill"
-    with cache_path.open("wb") as cache_file:
-        dill.dump(chat_data, cache_file)
+    disk_cache.set(hash_val, chat_data)
 
-    if clean_old_cache_files:
-        clear_old_cache_files()
 
-
-@create_cache_folder
 def load_cache(hash_val):
-    cache_path = Path(tempfile.gettempdir()) / PREFIX / f"{hash_val}.dill"
-    if cache_path.exists():
-        with cache_path.open("rb") as cache_file:
-            return dill.load(cache_file)
-    return None
+    from langflow.cache.disk import disk_cache
+
+    return disk_cache.get(hash_val)
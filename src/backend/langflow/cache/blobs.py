@@ -0,0 +1,247 @@
+import base64
+import binascii
+import contextlib
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Union
+
+from langflow.cache.base import PREFIX, LRUCache
+from langflow.utils.logger import logger
+
+BLOB_REFERENCE_PREFIX = "blob:"
+
+
+def is_blob_reference(content: Optional[str]) -> bool:
+    return bool(content) and content.startswith(BLOB_REFERENCE_PREFIX)  # type: ignore
+
+
+def decode_content(content: str) -> bytes:
+    """Decode base64 file content, with or without a data URL header."""
+    data = content.split(",", 1)[1] if "," in content else content
+    try:
+        return base64.b64decode(data)
+    except (binascii.Error, ValueError) as exc:
+        raise ValueError("File content is not valid base64") from exc
+
+
+class BlobStore:
+    """
+    A content addressed store for uploaded files.
+
+    Each file is saved once in a directory named after the sha256 of its
+    content, under its original name so loaders can tell its type.
+    Blobs that are pinned are kept, the others are evicted least recently
+    used first when the store grows over max_bytes. The objects that read
+    the files, such as registered flows and cached objects, hold their
+    blobs until they are removed.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Union[str, Path]] = None,
+        max_bytes: int = 1024**3,
+    ):
+        self.root = (
+            Path(root)
+            if root is not None
+            else Path(tempfile.gettempdir()) / PREFIX / "blobs"
+        )
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._refcounts: Dict[str, int] = {}
+        self._holders: Dict[Hashable, List[str]] = {}
+        # Maps the digest of encoded content to the digest of the decoded
+        # blob, so content that is sent again isn't decoded again
+        self._encoded_index = LRUCache(maxsize=1024, name="blob_index")
+
+    def reference(self, digest: str) -> str:
+        return f"{BLOB_REFERENCE_PREFIX}{digest}"
+
+    def put(self, data: bytes, file_name: str) -> str:
+        """Store the data under the given file name and return its digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._file_path(digest, file_name)
+        with self._lock:
+            if path.exists():
+                self._touch(digest)
+                return digest
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so that a blob is never
+            # read while it is partially written
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp_file:
+                    tmp_file.write(data)
+                os.replace(tmp_path, path)
+            except OSError:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+                raise
+            self.evict(keep=digest)
+        return digest
+
+    def put_encoded(self, content: str, file_name: str) -> str:
+        """Store base64 content, skipping the decoding if it was stored before."""
+        encoded_digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        digest = self._encoded_index.get(encoded_digest)
+        if digest is not None and self._file_path(digest, file_name).exists():
+            self._touch(digest)
+            return digest
+        digest = self.put(decode_content(content), file_name)
+        self._encoded_index.set(encoded_digest, digest)
+        return digest
+
+    def get_path(self, digest: str, file_name: Optional[str] = None) -> Path:
+        """
+        Get the path of a stored blob. If the blob was stored under another
+        name, a copy with the requested name is added next to it.
+        """
+        with self._lock:
+            blob_dir = self._blob_dir(digest)
+            files = (
+                [path for path in blob_dir.iterdir() if path.suffix != ".tmp"]
+                if blob_dir.is_dir()
+                else []
+            )
+            if not files:
+                raise ValueError(
+                    f"File {file_name or digest} was not found. Upload it again."
+                )
+            self._touch(digest)
+            if file_name is None:
+                return files[0]
+            path = self._file_path(digest, file_name)
+            if not path.exists():
+                shutil.copyfile(files[0], path)
+            return path
+
+    def resolve(self, content: str, file_name: str) -> Path:
+        """Get the path of a blob reference or of inline base64 content."""
+        if is_blob_reference(content):
+            digest = content[len(BLOB_REFERENCE_PREFIX) :]
+        else:
+            digest = self.put_encoded(content, file_name)
+        return self.get_path(digest, file_name)
+
+    def digest_of(self, path: Union[str, Path]) -> str:
+        """Get the digest of the blob a stored file belongs to."""
+        return Path(path).parent.name
+
+    def pin(self, digest: str):
+        """Keep a blob from being evicted until it is unpinned."""
+        with self._lock:
+            self._refcounts[digest] = self._refcounts.get(digest, 0) + 1
+
+    def unpin(self, digest: str):
+        with self._lock:
+            count = self._refcounts.get(digest, 0) - 1
+            if count > 0:
+                self._refcounts[digest] = count
+            else:
+                self._refcounts.pop(digest, None)
+
+    def hold(self, holder: Hashable, digests: Iterable[str]):
+        """Pin the blobs used by a holder, instead of the ones it held before."""
+        digests = list(digests)
+        with self._lock:
+            self.release(holder)
+            for digest in digests:
+                self.pin(digest)
+            if digests:
+                self._holders[holder] = digests
+
+    def release(self, holder: Hashable):
+        """Unpin the blobs used by a holder."""
+        with self._lock:
+            for digest in self._holders.pop(holder, []):
+                self.unpin(digest)
+
+    def flow_digests(self, data_graph: Dict[str, Any]) -> List[str]:
+        """Get the digests of the files of a flow, storing the inline ones."""
+        digests = []
+        for node in data_graph.get("nodes", []):
+            try:
+                template = node["data"]["node"]["template"]
+            except (KeyError, TypeError):
+                continue
+            for value in template.values():
+                if not isinstance(value, dict) or value.get("type") != "file":
+                    continue
+                content = value.get("content")
+                if not content:
+                    continue
+                if is_blob_reference(content):
+                    digests.append(content[len(BLOB_REFERENCE_PREFIX) :])
+                    continue
+                with contextlib.suppress(ValueError):
+                    digests.append(self.put_encoded(content, value.get("value", "")))
+        return digests
+
+    def is_pinned(self, digest: str) -> bool:
+        return self._refcounts.get(digest, 0) > 0
+
+    def total_bytes(self) -> int:
+        return sum(self._dir_size(path) for path in self._blob_dirs())
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove the least recently used blobs that aren't pinned until under max_bytes."""
+        with self._lock:
+            blob_dirs = sorted(self._blob_dirs(), key=lambda path: path.stat().st_mtime)
+            sizes = {path: self._dir_size(path) for path in blob_dirs}
+            total = sum(sizes.values())
+            for blob_dir in blob_dirs:
+                if total <= self.max_bytes:
+                    break
+                digest = blob_dir.name
+                if digest == keep or self.is_pinned(digest):
+                    continue
+                logger.debug(f"Evicting blob {digest}")
+                shutil.rmtree(blob_dir, ignore_errors=True)
+                total -= sizes[blob_dir]
+
+    def _blob_dir(self, digest: str) -> Path:
+        if len(digest) != 64 or any(char not in "0123456789abcdef" for char in digest):
+            raise ValueError(f"Invalid blob reference {digest}")
+        return self.root / digest
+
+    def _file_path(self, digest: str, file_name: str) -> Path:
+        # Only keep the name, so it can't point outside of the store
+        name = Path(file_name).name
+        if not name:
+            raise ValueError("A file name is required")
+        return self._blob_dir(digest) / name
+
+    def _blob_dirs(self):
+        if not self.root.is_dir():
+            return []
+        return [path for path in self.root.iterdir() if path.is_dir()]
+
+    def _dir_size(self, path: Path) -> int:
+        with contextlib.suppress(OSError):
+            return sum(file.stat().st_size for file in path.iterdir())
+        return 0
+
+    def _touch(self, digest: str):
+        with contextlib.suppress(OSError):
+            os.utime(self._blob_dir(digest))
+
+
+blob_store = BlobStore()
+
+
+def release_blobs(
+    namespace: str, holder_key: Callable[[Any], Hashable] = lambda key: key
+) -> Callable[[Hashable, Any], None]:
+    """
+    Get an on_remove callback for a cache whose entries hold blobs as
+    (namespace, holder_key(key)).
+    """
+
+    def release(key: Hashable, value: Any):
+        blob_store.release((namespace, holder_key(key)))
+
+    return release
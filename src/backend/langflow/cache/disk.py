@@ -0,0 +1,146 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import dill  # type: ignore
+
+from langflow.cache.base import PREFIX
+from langflow.settings import settings
+from langflow.utils.logger import logger
+
+SUFFIX = ".dill"
+
+
+class DiskCache:
+    """
+    A cache of pickled objects in a directory that can be shared by
+    several processes.
+
+    Entries are written to a temporary file and moved into place, so
+    readers never see a partially written entry. Reading an entry touches
+    it, and the least recently used entries are removed once the cache
+    holds more than max_bytes or max_entries.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self._directory = Path(directory) if directory is not None else None
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        # Size and last use of the entries in the directory, as of the
+        # last write of this process
+        self._index: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is not None:
+            return self._directory
+        if settings.cache_dir:
+            return Path(settings.cache_dir)
+        return Path(tempfile.gettempdir()) / PREFIX
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes or settings.cache_max_bytes
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries or settings.cache_max_entries
+
+    def path(self, key: str) -> Path:
+        # Keys are hashed so that any string is a safe file name
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{name}{SUFFIX}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        path = self.path(key)
+        try:
+            with path.open("rb") as cache_file:
+                value = dill.load(cache_file)
+        except FileNotFoundError:
+            return default
+        except Exception as exc:
+            # A corrupt entry is removed so that it is rebuilt
+            logger.warning(f"Could not load cache entry {path}: {exc}")
+            self._remove(path)
+            return default
+
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                dill.dump(value, tmp_file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            # Other processes may write to the same directory, so the
+            # limits are checked against what it holds, not what this
+            # process wrote
+            self._scan()
+            if self._is_full():
+                self._evict(keep=path.name)
+
+    def delete(self, key: str) -> None:
+        self._remove(self.path(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob(f"*{SUFFIX}"):
+                self._remove(path)
+            self._index.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def __len__(self) -> int:
+        return len(list(self.directory.glob(f"*{SUFFIX}")))
+
+    def _is_full(self) -> bool:
+        total = sum(size for size, _ in self._index.values())
+        return len(self._index) > self.max_entries or total > self.max_bytes
+
+    def _scan(self) -> None:
+        self._index.clear()
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                self._index[path.name] = (stat.st_size, stat.st_mtime)
+
+    def _evict(self, keep: str) -> None:
+        by_last_use = sorted(self._index.items(), key=lambda item: item[1][1])
+        total = sum(size for size, _ in self._index.values())
+        for name, (size, _) in by_last_use:
+            if len(self._index) <= self.max_entries and total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            self._remove(self.directory / name)
+            self._index.pop(name, None)
+            total -= size
+
+    def _remove(self, path: Path) -> None:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        self._index.pop(path.name, None)
+
+
+disk_cache = DiskCache()
@@ -4,14 +4,17 @@
 #   - Build each inner agent first, then build the outer agent
 
 import contextlib
+import hashlib
 import inspect
+import json
 import types
 import warnings
 from copy import deepcopy
 from typing import Any, Dict, List, Optional
 
 from langflow.cache import base as cache_utils
-from langflow.graph.constants import DIRECT_TYPES
+from langflow.cache.blobs import blob_store
+from langflow.graph.constants import DIRECT_TYPES, InstancePolicy
 from langflow.interface import loading
 from langflow.interface.listing import ALL_TYPES_DICT
 from langflow.utils.logger import logger
@@ -19,6 +22,13 @@ from langflow.utils.util import sync_to_async
 
 
 class Node:
+    # Node types that are not expensive to copy and don't say otherwise
+    # hand out deep copies of their built object
+    instance_policy: InstancePolicy = InstancePolicy.CLONE
+    # Whether the built object can be reused by any graph in the process
+    # that has an identical subgraph leading to this node
+    cacheable: bool = False
+
     def __init__(self, data: Dict, base_type: Optional[str] = None) -> None:
         self.id: str = data["id"]
         self._data = data
@@ -27,6 +37,10 @@ class Node:
         self._parse_data()
         self._built_object = None
         self._built = False
+        self._content_hash: Optional[str] = None
+        self._hashing = False
+        # The files of this node, which whoever keeps its object holds
+        self.blob_digests: List[str] = []
 
     def _parse_data(self) -> None:
         self.data = self._data["data"]
@@ -94,6 +108,7 @@ class Node:
                 file_path = cache_utils.save_binary_file(
                     content=content, file_name=file_name, accepted_types=type_to_load
                 )
+                self.blob_digests.append(blob_store.digest_of(file_path))
 
                 params[key] = file_path
 
@@ -192,39 +207,130 @@ class Node:
         # and instantiate it with the params
         # and return the instance
 
+        self._built_object = self._instantiate()
+        self._built = True
+
+    def _instantiate(self) -> Any:
+        if self.base_type is None:
+            raise ValueError(f"Base type for node {self.node_type} not found")
+        # Pass a copy of the params so that they can be reused
+        # to create new instances of this node
         try:
-            self._built_object = loading.instantiate_class(
+            built_object = loading.instantiate_class(
                 node_type=self.node_type,
                 base_type=self.base_type,
-                params=self.params,
+                params=self.params.copy(),
             )
         except Exception as exc:
             raise ValueError(
                 f"Error building node {self.node_type}: {str(exc)}"
             ) from exc
 
-        if self._built_object is None:
+        if built_object is None:
             raise ValueError(f"Node type {self.node_type} not found")
+        return built_object
+
+    def _get_instance(self) -> Any:
+        """Get the object handed out to other nodes, as per the instance policy."""
+        if self.instance_policy == InstancePolicy.SHARED:
+            return self._built_object
+        if self.instance_policy == InstancePolicy.FACTORY:
+            return self._instantiate()
+        return deepcopy(self._built_object)
+
+    def content_hash(self) -> str:
+        """
+        Get a hash of this node's type, its own values and the hashes
+        of the nodes it depends on, so that it identifies the whole
+        subgraph that produces this node's object.
+        """
+        # The hash is computed before building, while the params
+        # still point to the nodes instead of their built objects
+        if self._content_hash is not None:
+            return self._content_hash
+        if self._hashing:
+            raise ValueError(f"Circular dependency found at {self.node_type}")
+
+        values: Dict[str, Any] = {}
+        for key, value in self.data["node"]["template"].items():
+            if not isinstance(value, dict):
+                values[key] = value
+            elif value.get("type") == "file":
+                # Files are identified by their content, not by where they were saved
+                content = value.get("content") or ""
+                values[key] = [
+                    value.get("value"),
+                    hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                ]
+            elif value.get("type") in DIRECT_TYPES:
+                values[key] = value.get("value")
 
+        dependencies: Dict[str, Any] = {}
+        self._hashing = True
+        try:
+            for key, value in self.params.items():
+                if isinstance(value, Node) and value != self:
+                    dependencies[key] = value.content_hash()
+                elif (
+                    isinstance(value, list)
+                    and value
+                    and all(isinstance(node, Node) for node in value)
+                ):
+                    dependencies[key] = [node.content_hash() for node in value]
+        finally:
+            self._hashing = False
+
+        content = json.dumps(
+            {
+                "node_type": self.node_type,
+                "base_type": self.base_type,
+                "values": values,
+                "dependencies": dependencies,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        self._content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return self._content_hash
+
+    def load_cached(self) -> bool:
+        """
+        Reuse an object built by an identical subgraph, if there is one.
+
+        Returns True if the node is built.
+        """
+        if self._built or not self.cacheable:
+            return self._built
+        built_object = cache_utils.built_object_cache.get(self.content_hash())
+        if built_object is None:
+            return False
+        logger.debug(f"Reusing cached {self.node_type}")
+        self._built_object = built_object
         self._built = True
+        return True
 
     def build(self, force: bool = False) -> Any:
-        if not self._built or force:
+        if force or not self.load_cached():
+            # Hash the node before its params are replaced by built objects
+            if self.cacheable:
+                self.content_hash()
             self._build()
-
-        #! Deepcopy is breaking for vectorstores
-        if self.base_type in [
-            "vectorstores",
-            "VectorStoreRouterAgent",
-            "VectorStoreAgent",
-            "VectorStoreInfo",
-        ] or self.node_type in [
-            "VectorStoreInfo",
-            "VectorStoreRouterToolkit",
-            "SQLDatabase",
-        ]:
-            return self._built_object
-        return deepcopy(self._built_object)
+            if self.cacheable:
+                cache_utils.built_object_cache.set(
+                    self.content_hash(), self._built_object
+                )
+                blob_store.hold(
+                    ("built_objects", self.content_hash()), self.subgraph_blob_digests()
+                )
+        return self._get_instance()
+
+    def subgraph_blob_digests(self) -> List[str]:
+        """Get the files of this node and of the nodes it depends on."""
+        digests = list(self.blob_digests)
+        for edge in self.edges:
+            if edge.target == self:
+                digests.extend(edge.source.subgraph_blob_digests())
+        return digests
 
     def add_edge(self, edge: "Edge") -> None:
         self.edges.append(edge)
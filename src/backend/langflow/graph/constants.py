@@ -1 +1,14 @@
+from enum import Enum
+
 DIRECT_TYPES = ["str", "bool", "code", "int", "float", "Any", "prompt"]
+
+
+class InstancePolicy(str, Enum):
+    """How a built node hands out its object to the nodes that use it."""
+
+    # The same instance is returned every time
+    SHARED = "shared"
+    # A deep copy of the built instance is returned
+    CLONE = "clone"
+    # A new instance is created from the params the node was built with
+    FACTORY = "factory"
@@ -1,4 +1,5 @@
-from typing import Dict, List, Type, Union
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Type, Union
 
 from langflow.graph.base import Edge, Node
 from langflow.graph.nodes import (
@@ -13,9 +14,11 @@ from langflow.graph.nodes import (
     TextSplitterNode,
     ToolkitNode,
     ToolNode,
+    UtilityNode,
     VectorStoreNode,
     WrapperNode,
 )
+from langflow.graph.planner import BuildPlanner, BuildReport
 from langflow.interface.agents.base import agent_creator
 from langflow.interface.chains.base import chain_creator
 from langflow.interface.document_loaders.base import documentloader_creator
@@ -27,11 +30,54 @@ from langflow.interface.text_splitters.base import textsplitter_creator
 from langflow.interface.toolkits.base import toolkits_creator
 from langflow.interface.tools.base import tool_creator
 from langflow.interface.tools.constants import FILE_TOOLS
+from langflow.interface.utilities.base import utility_creator
 from langflow.interface.vector_store.base import vectorstore_creator
 from langflow.interface.wrappers.base import wrapper_creator
+from langflow.settings import settings
 from langflow.utils import payload
 
 
+_NODE_TYPE_MAP: Dict[str, Type[Node]] = {}
+_NODE_TYPE_MAP_FINGERPRINT: Optional[str] = None
+
+
+def get_node_type_map() -> Dict[str, Type[Node]]:
+    """
+    Get the map from component name to Node class.
+
+    The map is built once and reused until the settings change
+    or invalidate_node_type_map is called.
+    """
+    global _NODE_TYPE_MAP, _NODE_TYPE_MAP_FINGERPRINT
+
+    fingerprint = settings.fingerprint()
+    if fingerprint != _NODE_TYPE_MAP_FINGERPRINT:
+        _NODE_TYPE_MAP = {
+            **{t: PromptNode for t in prompt_creator.to_list()},
+            **{t: AgentNode for t in agent_creator.to_list()},
+            **{t: ChainNode for t in chain_creator.to_list()},
+            **{t: ToolNode for t in tool_creator.to_list()},
+            **{t: ToolkitNode for t in toolkits_creator.to_list()},
+            **{t: WrapperNode for t in wrapper_creator.to_list()},
+            **{t: LLMNode for t in llm_creator.to_list()},
+            **{t: MemoryNode for t in memory_creator.to_list()},
+            **{t: EmbeddingNode for t in embedding_creator.to_list()},
+            **{t: VectorStoreNode for t in vectorstore_creator.to_list()},
+            **{t: DocumentLoaderNode for t in documentloader_creator.to_list()},
+            **{t: TextSplitterNode for t in textsplitter_creator.to_list()},
+            **{t: UtilityNode for t in utility_creator.to_list()},
+        }
+        _NODE_TYPE_MAP_FINGERPRINT = fingerprint
+    return _NODE_TYPE_MAP
+
+
+def invalidate_node_type_map() -> None:
+    """Force the node type map to be rebuilt on its next use."""
+    global _NODE_TYPE_MAP_FINGERPRINT
+
+    _NODE_TYPE_MAP_FINGERPRINT = None
+
+
 class Graph:
     def __init__(
         self,
@@ -40,10 +86,12 @@ class Graph:
     ) -> None:
         self._nodes = nodes
         self._edges = edges
+        self.build_report: Optional[BuildReport] = None
         self._build_graph()
 
     def _build_graph(self) -> None:
         self.nodes = self._build_nodes()
+        self._node_map: Dict[str, Node] = {node.id: node for node in self.nodes}
         self.edges = self._build_edges()
         for edge in self.edges:
             edge.source.add_edge(edge)
@@ -68,40 +116,57 @@ class Graph:
             if self._validate_node(node)
             or (len(self.nodes) == 1 and len(self.edges) == 0)
         ]
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        # Index nodes by id and edges by the ids of their endpoints
+        # so that lookups don't scan the whole graph
+        self._node_map = {node.id: node for node in self.nodes}
+        self._in_edges: Dict[str, List[Edge]] = defaultdict(list)
+        self._out_edges: Dict[str, List[Edge]] = defaultdict(list)
+        for edge in self.edges:
+            self._out_edges[edge.source.id].append(edge)
+            self._in_edges[edge.target.id].append(edge)
 
     def _validate_node(self, node: Node) -> bool:
         # All nodes that do not have edges are invalid
         return len(node.edges) > 0
 
     def get_node(self, node_id: str) -> Union[None, Node]:
-        return next((node for node in self.nodes if node.id == node_id), None)
+        return self._node_map.get(node_id)
 
     def get_nodes_with_target(self, node: Node) -> List[Node]:
         connected_nodes: List[Node] = [
-            edge.source for edge in self.edges if edge.target == node
+            edge.source for edge in self._in_edges.get(node.id, [])
+        ]
+        return connected_nodes
+
+    def get_nodes_with_source(self, node: Node) -> List[Node]:
+        connected_nodes: List[Node] = [
+            edge.target for edge in self._out_edges.get(node.id, [])
         ]
         return connected_nodes
 
-    def build(self) -> List[Node]:
+    def build(self) -> Any:
         # Get root node
         root_node = payload.get_root_node(self)
         if root_node is None:
             raise ValueError("No root node found")
-        return root_node.build()
+        # Build the nodes in dependency order, recording how long each one takes
+        planner = BuildPlanner(self)
+        try:
+            return planner.build(root_node, max_workers=settings.build_concurrency)
+        finally:
+            self.build_report = planner.report
 
     def get_node_neighbors(self, node: Node) -> Dict[Node, int]:
         neighbors: Dict[Node, int] = {}
-        for edge in self.edges:
-            if edge.source == node:
-                neighbor = edge.target
-                if neighbor not in neighbors:
-                    neighbors[neighbor] = 0
-                neighbors[neighbor] += 1
-            elif edge.target == node:
-                neighbor = edge.source
-                if neighbor not in neighbors:
-                    neighbors[neighbor] = 0
-                neighbors[neighbor] += 1
+        for neighbor in self.get_nodes_with_source(node):
+            neighbors[neighbor] = neighbors.get(neighbor, 0) + 1
+        for neighbor in self.get_nodes_with_target(node):
+            # Self loops were already counted as outgoing edges
+            if neighbor != node:
+                neighbors[neighbor] = neighbors.get(neighbor, 0) + 1
         return neighbors
 
     def _build_edges(self) -> List[Edge]:
@@ -120,21 +185,14 @@ class Graph:
             edges.append(Edge(source, target))
         return edges
 
-    def _get_node_class(self, node_type: str, node_lc_type: str) -> Type[Node]:
-        node_type_map: Dict[str, Type[Node]] = {
-            **{t: PromptNode for t in prompt_creator.to_list()},
-            **{t: AgentNode for t in agent_creator.to_list()},
-            **{t: ChainNode for t in chain_creator.to_list()},
-            **{t: ToolNode for t in tool_creator.to_list()},
-            **{t: ToolkitNode for t in toolkits_creator.to_list()},
-            **{t: WrapperNode for t in wrapper_creator.to_list()},
-            **{t: LLMNode for t in llm_creator.to_list()},
-            **{t: MemoryNode for t in memory_creator.to_list()},
-            **{t: EmbeddingNode for t in embedding_creator.to_list()},
-            **{t: VectorStoreNode for t in vectorstore_creator.to_list()},
-            **{t: DocumentLoaderNode for t in documentloader_creator.to_list()},
-            **{t: TextSplitterNode for t in textsplitter_creator.to_list()},
-        }
+    def _get_node_class(
+        self,
+        node_type: str,
+        node_lc_type: str,
+        node_type_map: Optional[Dict[str, Type[Node]]] = None,
+    ) -> Type[Node]:
+        if node_type_map is None:
+            node_type_map = get_node_type_map()
 
         if node_type in FILE_TOOLS:
             return FileToolNode
@@ -146,12 +204,13 @@ class Graph:
 
     def _build_nodes(self) -> List[Node]:
         nodes: List[Node] = []
+        node_type_map = get_node_type_map()
         for node in self._nodes:
             node_data = node["data"]
             node_type: str = node_data["type"]  # type: ignore
             node_lc_type: str = node_data["node"]["template"]["_type"]  # type: ignore
 
-            NodeClass = self._get_node_class(node_type, node_lc_type)
+            NodeClass = self._get_node_class(node_type, node_lc_type, node_type_map)
             nodes.append(NodeClass(node))
 
         return nodes
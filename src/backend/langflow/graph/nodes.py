@@ -1,10 +1,13 @@
 from typing import Any, Dict, List, Optional, Union
 
 from langflow.graph.base import Node
+from langflow.graph.constants import InstancePolicy
 from langflow.graph.utils import extract_input_variables_from_prompt
 
 
 class AgentNode(Node):
+    instance_policy = InstancePolicy.SHARED
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="agents")
 
@@ -12,6 +15,8 @@ class AgentNode(Node):
         self.chains: List[ChainNode] = []
 
     def _set_tools_and_chains(self) -> None:
+        self.tools = []
+        self.chains = []
         for edge in self.edges:
             source_node = edge.source
             if isinstance(source_node, ToolNode):
@@ -32,20 +37,24 @@ class AgentNode(Node):
 
             self._build()
 
-        #! Cannot deepcopy VectorStore, VectorStoreRouter, or SQL agents
-        if self.node_type in ["VectorStoreAgent", "VectorStoreRouterAgent", "SQLAgent"]:
-            return self._built_object
-        return self._built_object
+        return self._get_instance()
 
 
 class ToolNode(Node):
+    # Tools are cheap to create and may hold LLMs that are expensive to copy
+    instance_policy = InstancePolicy.FACTORY
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="tools")
 
 
 class PromptNode(Node):
+    instance_policy = InstancePolicy.SHARED
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="prompts")
+        # Tools of the agent this prompt belongs to, if any
+        self.tools: Optional[List[ToolNode]] = None
 
     def build(
         self,
@@ -58,6 +67,8 @@ class PromptNode(Node):
                 or self.params["input_variables"] is None
             ):
                 self.params["input_variables"] = []
+            if tools is None:
+                tools = self.tools
             # Check if it is a ZeroShotPrompt and needs a tool
             if "ShotPrompt" in self.node_type:
                 tools = (
@@ -80,10 +91,12 @@ class PromptNode(Node):
             self.params["input_variables"] = list(set(self.params["input_variables"]))
 
             self._build()
-        return self._built_object
+        return self._get_instance()
 
 
 class ChainNode(Node):
+    instance_policy = InstancePolicy.SHARED
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="chains")
 
@@ -101,13 +114,11 @@ class ChainNode(Node):
 
             self._build()
 
-        #! Cannot deepcopy SQLDatabaseChain
-        if self.node_type in ["SQLDatabaseChain"]:
-            return self._built_object
-        return self._built_object
+        return self._get_instance()
 
 
 class LLMNode(Node):
+    instance_policy = InstancePolicy.SHARED
     built_node_type = None
     class_built_object = None
 
@@ -125,20 +136,28 @@ class LLMNode(Node):
             self.class_built_object = self._built_object
         # Avoid deepcopying the LLM
         # that are loaded from a file
-        return self._built_object
+        return self._get_instance()
 
 
 class ToolkitNode(Node):
+    # Toolkits may hold vector stores, which can't be deep copied
+    instance_policy = InstancePolicy.SHARED
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="toolkits")
 
 
 class FileToolNode(ToolNode):
+    # Avoid reading the file again for every instance
+    instance_policy = InstancePolicy.SHARED
+
     def __init__(self, data: Dict):
         super().__init__(data)
 
 
 class WrapperNode(Node):
+    instance_policy = InstancePolicy.SHARED
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="wrappers")
 
@@ -147,10 +166,14 @@ class WrapperNode(Node):
             if "headers" in self.params:
                 self.params["headers"] = eval(self.params["headers"])
             self._build()
-        return self._built_object
+        return self._get_instance()
 
 
 class DocumentLoaderNode(Node):
+    # The loaded documents are only read by the nodes that use them
+    instance_policy = InstancePolicy.SHARED
+    cacheable = True
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="documentloaders")
 
@@ -164,11 +187,18 @@ class DocumentLoaderNode(Node):
 
 
 class EmbeddingNode(Node):
+    instance_policy = InstancePolicy.SHARED
+    cacheable = True
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="embeddings")
 
 
 class VectorStoreNode(Node):
+    # Vector stores can't be deep copied and are expensive to create
+    instance_policy = InstancePolicy.SHARED
+    cacheable = True
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="vectorstores")
 
@@ -177,11 +207,17 @@ class VectorStoreNode(Node):
 
 
 class MemoryNode(Node):
+    # Every chain or agent gets its own memory
+    instance_policy = InstancePolicy.FACTORY
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="memory")
 
 
 class TextSplitterNode(Node):
+    instance_policy = InstancePolicy.SHARED
+    cacheable = True
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="textsplitters")
 
@@ -191,3 +227,11 @@ class TextSplitterNode(Node):
         if self._built_object:
             return f"""{self.node_type}({len(self._built_object)} documents)\nDocuments: {self._built_object[:3]}..."""
         return f"{self.node_type}()"
+
+
+class UtilityNode(Node):
+    # Utilities such as SQLDatabase hold connections that can't be deep copied
+    instance_policy = InstancePolicy.SHARED
+
+    def __init__(self, data: Dict):
+        super().__init__(data, base_type="utilities")
@@ -0,0 +1,195 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from langflow.graph.base import Node
+from langflow.graph.nodes import AgentNode, ChainNode, PromptNode
+from langflow.utils.logger import logger
+
+if TYPE_CHECKING:
+    from langflow.graph.graph import Graph
+
+_VISITING = 1
+_DONE = 2
+
+
+class NodeBuildRecord(BaseModel):
+    """Timing and outcome of building a single node."""
+
+    node_id: str
+    node_type: str
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+class BuildReport(BaseModel):
+    """Report of a graph build, with one record per built node."""
+
+    records: List[NodeBuildRecord] = []
+    total_duration: float = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return any(record.error is not None for record in self.records)
+
+    def slowest(self) -> Optional[NodeBuildRecord]:
+        """Get the node that took the longest to build."""
+        if not self.records:
+            return None
+        return max(self.records, key=lambda record: record.duration)
+
+
+class BuildPlanner:
+    """
+    Builds the nodes of a graph in dependency order without recursion.
+
+    The planner sorts the nodes a root depends on topologically, so each node
+    is built exactly once and only after everything it needs has been built.
+    """
+
+    def __init__(self, graph: "Graph"):
+        self.graph = graph
+        self.report = BuildReport()
+
+    def get_dependencies(self, node: Node) -> List[Node]:
+        """Get the nodes that must be built before the given node."""
+        dependencies: List[Node] = []
+        if isinstance(node, AgentNode):
+            # Agents build their tools first and then their chains
+            node._set_tools_and_chains()
+            dependencies.extend(node.tools)
+            dependencies.extend(node.chains)
+        for value in node.params.values():
+            values = value if isinstance(value, list) else [value]
+            for dependency in values:
+                if (
+                    isinstance(dependency, Node)
+                    and dependency != node
+                    and dependency not in dependencies
+                ):
+                    dependencies.append(dependency)
+        # ZeroShot prompts build the tools of the agent they belong to
+        if isinstance(node, PromptNode) and node.tools is not None:
+            dependencies.extend(node.tools)
+        return dependencies
+
+    def plan(self, root: Node) -> List[Node]:
+        """Get the nodes needed to build the root, in the order to build them."""
+        order: List[Node] = []
+        state: Dict[Node, int] = {}
+        stack: List[Tuple[Node, bool, Optional[Node]]] = [(root, False, None)]
+        while stack:
+            node, expanded, parent = stack.pop()
+            if expanded:
+                state[node] = _DONE
+                order.append(node)
+                continue
+            if state.get(node) == _DONE:
+                continue
+            if state.get(node) == _VISITING:
+                raise ValueError(f"Circular dependency found at {node.node_type}")
+            if node.cacheable and node.load_cached():
+                # Built by an identical subgraph, so its dependencies aren't needed
+                state[node] = _DONE
+                order.append(node)
+                continue
+            state[node] = _VISITING
+            if isinstance(node, ChainNode) and isinstance(parent, AgentNode):
+                self._set_prompt_tools(node, parent)
+            stack.append((node, True, parent))
+            for dependency in reversed(self.get_dependencies(node)):
+                if state.get(dependency) != _DONE:
+                    stack.append((dependency, False, node))
+        return order
+
+    def _set_prompt_tools(self, chain_node: ChainNode, agent_node: AgentNode):
+        # The prompt of a chain is built with the tools of the first agent
+        # that reaches it, which is the innermost one when chains are shared
+        for value in chain_node.params.values():
+            if isinstance(value, PromptNode) and value.tools is None:
+                value.tools = agent_node.tools
+
+    def build(self, root: Node, max_workers: int = 1) -> Any:
+        """
+        Build every node the root depends on, then the root itself.
+
+        If max_workers is greater than one, independent branches are built
+        at the same time on a thread pool of that size.
+        """
+        self.report = BuildReport()
+        start = time.perf_counter()
+        try:
+            order = self.plan(root)
+            # Hash every node while its params still point to other nodes
+            for node in order:
+                node.content_hash()
+            if max_workers > 1 and len(order) > 1:
+                return self._build_concurrently(order, max_workers)
+            built_object = None
+            for node in order:
+                built_object = self._build_node(node)
+            return built_object
+        finally:
+            self.report.total_duration = time.perf_counter() - start
+            if slowest := self.report.slowest():
+                logger.debug(
+                    f"Built {len(self.report.records)} nodes in "
+                    f"{self.report.total_duration:.3f}s, slowest was "
+                    f"{slowest.node_type} ({slowest.duration:.3f}s)"
+                )
+
+    def _build_concurrently(self, order: List[Node], max_workers: int) -> Any:
+        planned = set(order)
+        remaining: Dict[Node, int] = {}
+        dependents: Dict[Node, List[Node]] = {node: [] for node in order}
+        for node in order:
+            dependencies = [
+                dependency
+                for dependency in self.get_dependencies(node)
+                if dependency in planned
+            ]
+            remaining[node] = len(dependencies)
+            for dependency in dependencies:
+                dependents[dependency].append(node)
+
+        results: Dict[Node, Any] = {}
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="langflow-build"
+        ) as executor:
+            pending: Dict[Future, Node] = {
+                executor.submit(self._build_node, node): node
+                for node in order
+                if remaining[node] == 0
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = pending.pop(future)
+                    try:
+                        results[node] = future.result()
+                    except Exception:
+                        # Don't start anything else, but let running builds finish
+                        for pending_future in pending:
+                            pending_future.cancel()
+                        raise
+                    # Schedule the nodes that were only waiting on this one
+                    for dependent in dependents[node]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            future = executor.submit(self._build_node, dependent)
+                            pending[future] = dependent
+        return results[order[-1]]
+
+    def _build_node(self, node: Node) -> Any:
+        record = NodeBuildRecord(node_id=node.id, node_type=node.node_type)
+        self.report.records.append(record)
+        start = time.perf_counter()
+        try:
+            return node.build()
+        except Exception as exc:
+            record.error = str(exc)
+            raise
+        finally:
+            record.duration = time.perf_counter() - start
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 
 from langchain.agents import loading
 
@@ -14,7 +14,7 @@ class AgentCreator(LangChainTypeCreator):
     type_name: str = "agents"
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
             self.type_dict = loading.AGENT_TO_CLASS
             # Add JsonAgent to the list of agents
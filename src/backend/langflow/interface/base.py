@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Type, Union
+from typing import Any, Dict, List, Mapping, Optional, Type, Union
 
 from pydantic import BaseModel
 
@@ -13,7 +13,7 @@ from langflow.utils.logger import logger
 
 class LangChainTypeCreator(BaseModel, ABC):
     type_name: str
-    type_dict: Optional[Dict] = None
+    type_dict: Optional[Mapping] = None
 
     @property
     def frontend_node_class(self) -> Type[FrontendNode]:
@@ -22,7 +22,7 @@ class LangChainTypeCreator(BaseModel, ABC):
 
     @property
     @abstractmethod
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
             raise NotImplementedError
         return self.type_dict
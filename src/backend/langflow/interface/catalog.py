@@ -0,0 +1,161 @@
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Optional, Union
+
+from fastapi.encoders import jsonable_encoder
+
+from langflow.cache.base import PREFIX
+from langflow.settings import settings
+from langflow.utils.logger import logger
+
+CATALOG_SNAPSHOT_VERSION = 1
+
+
+def get_package_version(package: str) -> str:
+    """Get the installed version of a package without importing it."""
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+@functools.lru_cache(maxsize=None)
+def get_source_mtime() -> float:
+    """
+    Get the latest modification time of the langflow source files, when
+    they were first checked in this process.
+    """
+    package_path = Path(__file__).parent.parent
+    return max(
+        (path.stat().st_mtime for path in package_path.rglob("*.py")), default=0.0
+    )
+
+
+class CatalogEntry:
+    """A serialized snapshot of the component catalog."""
+
+    def __init__(self, body: bytes, fingerprint: str):
+        self.body = body
+        self.fingerprint = fingerprint
+        self.etag = f'"{hashlib.sha256(body).hexdigest()}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Check if an If-None-Match header matches this entry's ETag."""
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(
+            tag.removeprefix("W/") == self.etag for tag in candidates
+        )
+
+
+class ComponentCatalog:
+    """
+    Builds the dictionary of all langchain types once and serves it
+    pre-serialized. The catalog is rebuilt only when the settings change.
+
+    The serialized catalog is also written to a snapshot on disk, keyed by the
+    langchain and langflow versions and the settings, so that later processes
+    can load it without introspecting every component again.
+    """
+
+    def __init__(self, snapshot_dir: Optional[Union[str, Path]] = None):
+        self._entry: Optional[CatalogEntry] = None
+        self._lock = threading.Lock()
+        self.snapshot_dir = (
+            Path(snapshot_dir)
+            if snapshot_dir is not None
+            else Path(tempfile.gettempdir()) / PREFIX / "catalog"
+        )
+
+    def get(self) -> CatalogEntry:
+        """Get the catalog entry for the current settings, building it if needed."""
+        fingerprint = settings.fingerprint()
+        entry = self._entry
+        if entry is not None and entry.fingerprint == fingerprint:
+            return entry
+
+        with self._lock:
+            # Another thread may have built it while we waited
+            entry = self._entry
+            if entry is None or entry.fingerprint != fingerprint:
+                entry = self._load_snapshot(fingerprint) or self._build(fingerprint)
+                self._entry = entry
+        return entry
+
+    def invalidate(self):
+        """Drop the cached catalog so the next call rebuilds it."""
+        with self._lock:
+            self._entry = None
+
+    def source_key(self) -> str:
+        """Hash of the versions and sources the snapshots were built from."""
+        key = json.dumps(
+            {
+                "snapshot": CATALOG_SNAPSHOT_VERSION,
+                "langchain": get_package_version("langchain"),
+                "langflow": get_package_version("langflow"),
+                "source_mtime": get_source_mtime(),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    def snapshot_path(self, fingerprint: str) -> Path:
+        return self.snapshot_dir / f"{self.source_key()}-{fingerprint}.json"
+
+    def _build(self, fingerprint: str) -> CatalogEntry:
+        from langflow.interface.types import build_langchain_types_dict
+
+        logger.debug("Building component catalog")
+        all_types = jsonable_encoder(build_langchain_types_dict())
+        body = json.dumps(all_types).encode("utf-8")
+        self._save_snapshot(fingerprint, body)
+        return CatalogEntry(body=body, fingerprint=fingerprint)
+
+    def _load_snapshot(self, fingerprint: str) -> Optional[CatalogEntry]:
+        path = self.snapshot_path(fingerprint)
+        try:
+            body = path.read_bytes()
+        except OSError:
+            return None
+        logger.debug(f"Loaded component catalog snapshot from {path}")
+        return CatalogEntry(body=body, fingerprint=fingerprint)
+
+    def _save_snapshot(self, fingerprint: str, body: bytes):
+        path = self.snapshot_path(fingerprint)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so that concurrent workers
+            # never read a partially written snapshot
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(body)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning(f"Could not save component catalog snapshot: {exc}")
+            if tmp_path is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+            return
+        self._prune_snapshots()
+
+    def _prune_snapshots(self):
+        # Snapshots of other versions or sources are never loaded again
+        prefix = f"{self.source_key()}-"
+        for path in self.snapshot_dir.glob("*.json"):
+            if not path.name.startswith(prefix):
+                logger.debug(f"Removing stale component catalog snapshot {path}")
+                with contextlib.suppress(OSError):
+                    path.unlink()
+
+
+component_catalog = ComponentCatalog()
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Mapping, Optional, Type
 
 from langflow.custom.customs import get_custom_nodes
 from langflow.interface.base import LangChainTypeCreator
@@ -19,18 +19,18 @@ class ChainCreator(LangChainTypeCreator):
         return ChainFrontendNode
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
-            self.type_dict = chain_type_to_cls_dict
             from langflow.interface.chains.custom import CUSTOM_CHAINS
 
-            self.type_dict.update(CUSTOM_CHAINS)
+            for name, chain in CUSTOM_CHAINS.items():
+                chain_type_to_cls_dict.register(name, chain)
             # Filter according to settings.chains
-            self.type_dict = {
-                name: chain
-                for name, chain in self.type_dict.items()
+            self.type_dict = chain_type_to_cls_dict.subset(
+                name
+                for name in chain_type_to_cls_dict
                 if name in settings.chains or settings.dev
-            }
+            )
         return self.type_dict
 
     def get_signature(self, name: str) -> Optional[Dict]:
@@ -9,42 +9,36 @@ from langchain import (
     memory,
     requests,
     text_splitter,
+    vectorstores,
 )
 from langchain.agents import agent_toolkits
 from langchain.chat_models import ChatOpenAI
 
-from langflow.interface.importing.utils import import_class
+from langflow.interface.importing.utils import LazyClassRegistry
 
 ## LLMs
 llm_type_to_cls_dict = llms.type_to_cls_dict
 llm_type_to_cls_dict["openai-chat"] = ChatOpenAI  # type: ignore
 
 ## Chains
-chain_type_to_cls_dict: dict[str, Any] = {
-    chain_name: import_class(f"langchain.chains.{chain_name}")
-    for chain_name in chains.__all__
-}
+# The classes below are only imported when they are first accessed
+chain_type_to_cls_dict = LazyClassRegistry("langchain.chains", chains.__all__)
 
 ## Toolkits
-toolkit_type_to_loader_dict: dict[str, Any] = {
-    toolkit_name: import_class(f"langchain.agents.agent_toolkits.{toolkit_name}")
+toolkit_type_to_loader_dict = LazyClassRegistry(
+    "langchain.agents.agent_toolkits",
     # if toolkit_name is lower case it is a loader
-    for toolkit_name in agent_toolkits.__all__
-    if toolkit_name.islower()
-}
+    [name for name in agent_toolkits.__all__ if name.islower()],
+)
 
-toolkit_type_to_cls_dict: dict[str, Any] = {
-    toolkit_name: import_class(f"langchain.agents.agent_toolkits.{toolkit_name}")
+toolkit_type_to_cls_dict = LazyClassRegistry(
+    "langchain.agents.agent_toolkits",
     # if toolkit_name is not lower case it is a class
-    for toolkit_name in agent_toolkits.__all__
-    if not toolkit_name.islower()
-}
+    [name for name in agent_toolkits.__all__ if not name.islower()],
+)
 
 ## Memories
-memory_type_to_cls_dict: dict[str, Any] = {
-    memory_name: import_class(f"langchain.memory.{memory_name}")
-    for memory_name in memory.__all__
-}
+memory_type_to_cls_dict = LazyClassRegistry("langchain.memory", memory.__all__)
 
 ## Wrappers
 wrapper_type_to_cls_dict: dict[str, Any] = {
@@ -52,19 +46,20 @@ wrapper_type_to_cls_dict: dict[str, Any] = {
 }
 
 ## Embeddings
-embedding_type_to_cls_dict: dict[str, Any] = {
-    embedding_name: import_class(f"langchain.embeddings.{embedding_name}")
-    for embedding_name in embeddings.__all__
-}
+embedding_type_to_cls_dict = LazyClassRegistry(
+    "langchain.embeddings", embeddings.__all__
+)
 
 
 ## Document Loaders
-documentloaders_type_to_cls_dict: dict[str, Any] = {
-    documentloader_name: import_class(
-        f"langchain.document_loaders.{documentloader_name}"
-    )
-    for documentloader_name in document_loaders.__all__
-}
+documentloaders_type_to_cls_dict = LazyClassRegistry(
+    "langchain.document_loaders", document_loaders.__all__
+)
+
+## Vector Stores
+vectorstore_type_to_cls_dict = LazyClassRegistry(
+    "langchain.vectorstores", vectorstores.__all__
+)
 
 ## Text Splitters
 textsplitter_type_to_cls_dict: dict[str, Any] = dict(
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 
 from langflow.interface.base import LangChainTypeCreator
 from langflow.interface.custom_lists import documentloaders_type_to_cls_dict
@@ -26,7 +26,7 @@ class DocumentLoaderCreator(LangChainTypeCreator):
     type_name: str = "documentloaders"
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         return documentloaders_type_to_cls_dict
 
     def get_signature(self, name: str) -> Optional[Dict]:
@@ -140,9 +140,9 @@ class DocumentLoaderCreator(LangChainTypeCreator):
 
     def to_list(self) -> List[str]:
         return [
-            documentloader.__name__
-            for documentloader in self.type_to_loader_dict.values()
-            if documentloader.__name__ in settings.documentloaders or settings.dev
+            documentloader
+            for documentloader in self.type_to_loader_dict.keys()
+            if documentloader in settings.documentloaders or settings.dev
         ]
 
 
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Mapping, Optional, Type
 
 from langflow.interface.base import LangChainTypeCreator
 from langflow.interface.custom_lists import embedding_type_to_cls_dict
@@ -13,7 +13,7 @@ class EmbeddingCreator(LangChainTypeCreator):
     type_name: str = "embeddings"
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         return embedding_type_to_cls_dict
 
     @property
@@ -33,9 +33,9 @@ class EmbeddingCreator(LangChainTypeCreator):
 
     def to_list(self) -> List[str]:
         return [
-            embedding.__name__
-            for embedding in self.type_to_loader_dict.values()
-            if embedding.__name__ in settings.embeddings or settings.dev
+            embedding
+            for embedding in self.type_to_loader_dict.keys()
+            if embedding in settings.embeddings or settings.dev
         ]
 
 
@@ -0,0 +1,81 @@
+import threading
+from typing import Any, Dict, Optional
+
+from langflow.cache.backends import ConfiguredCache
+from langflow.cache.base import LRUCache, compute_dict_hash
+from langflow.cache.blobs import blob_store, release_blobs
+from langflow.interface.run import build_langchain_object
+from langflow.utils.logger import logger
+
+
+class FlowRegistry:
+    """
+    Flows registered by id, so they can be run without sending them again.
+
+    A flow is validated by building it when it's registered. Its data is
+    kept in the configured cache backend, so every worker can run it, and
+    each worker keeps the objects it built in memory. The files of a flow
+    are held in the blob store until it's removed.
+    """
+
+    def __init__(self, max_flows: int = 1000, max_objects: int = 100):
+        self._flows = ConfiguredCache(
+            "registered_flows",
+            maxsize=max_flows,
+            on_remove=release_blobs("registered_flows"),
+        )
+        self._objects = LRUCache(maxsize=max_objects, name="registered_objects")
+        self._lock = threading.Lock()
+
+    def register(self, flow_id: str, data_graph: Dict[str, Any]) -> str:
+        """Build a flow and register it under the given id. Returns its hash."""
+        flow_hash = compute_dict_hash(data_graph)
+        langchain_object = build_langchain_object(data_graph)
+        if langchain_object is None:
+            raise ValueError(
+                "There was an error loading the langchain_object. Please, check all the nodes and try again."
+            )
+        self._flows.set(flow_id, {"hash": flow_hash, "data": data_graph})
+        self._objects.set(flow_id, (flow_hash, langchain_object))
+        self._hold_blobs(flow_id, data_graph)
+        logger.debug(f"Registered flow {flow_id}")
+        return flow_hash
+
+    def get_hash(self, flow_id: str) -> Optional[str]:
+        flow = self._flows.get(flow_id)
+        return flow["hash"] if flow is not None else None
+
+    def get_object(self, flow_id: str) -> Any:
+        """Get the built object of a registered flow, building it if needed."""
+        flow = self._flows.get(flow_id)
+        if flow is None:
+            raise KeyError(flow_id)
+        cached = self._objects.get(flow_id)
+        if cached is not None and cached[0] == flow["hash"]:
+            return cached[1]
+
+        # The flow was registered by another worker, or changed since
+        with self._lock:
+            cached = self._objects.get(flow_id)
+            if cached is not None and cached[0] == flow["hash"]:
+                return cached[1]
+            langchain_object = build_langchain_object(flow["data"])
+            self._objects.set(flow_id, (flow["hash"], langchain_object))
+            self._hold_blobs(flow_id, flow["data"])
+        return langchain_object
+
+    def _hold_blobs(self, flow_id: str, data_graph: Dict[str, Any]):
+        blob_store.hold(
+            ("registered_flows", flow_id), blob_store.flow_digests(data_graph)
+        )
+
+    def remove(self, flow_id: str) -> bool:
+        """Unregister a flow. Returns False if it wasn't registered."""
+        self._objects.pop(flow_id)
+        return self._flows.pop(flow_id) is not None
+
+    def __contains__(self, flow_id: str) -> bool:
+        return flow_id in self._flows
+
+
+flow_registry = FlowRegistry()
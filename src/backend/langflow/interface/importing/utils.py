@@ -1,7 +1,7 @@
 # This module is used to import any langchain class by name.
 
 import importlib
-from typing import Any, Type
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Type
 
 from langchain import PromptTemplate
 from langchain.agents import Agent
@@ -25,6 +25,56 @@ def import_module(module_path: str) -> Any:
     return getattr(module, object_name)
 
 
+class LazyClassRegistry(Mapping[str, Any]):
+    """
+    Maps component names to classes that are only imported when accessed.
+
+    The names are known up front, so listing the registry is cheap, but the
+    module of each class is imported the first time the class is requested.
+    """
+
+    def __init__(
+        self,
+        module_path: str,
+        names: Iterable[str],
+        loaded: Optional[Dict[str, Any]] = None,
+    ):
+        self.module_path = module_path
+        self._names = list(dict.fromkeys(names))
+        self._loaded: Dict[str, Any] = loaded if loaded is not None else {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._loaded:
+            if name not in self._names:
+                raise KeyError(name)
+            self._loaded[name] = import_class(f"{self.module_path}.{name}")
+        return self._loaded[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def register(self, name: str, cls: Any) -> None:
+        """Register an already imported class under a name."""
+        if name not in self._names:
+            self._names.append(name)
+        self._loaded[name] = cls
+
+    def subset(self, names: Iterable[str]) -> "LazyClassRegistry":
+        """Return a registry restricted to the given names, sharing imports."""
+        selected = set(names)
+        return LazyClassRegistry(
+            self.module_path,
+            [name for name in self._names if name in selected],
+            loaded=self._loaded,
+        )
+
+
 def import_by_type(_type: str, name: str) -> Any:
     """Import class by type and name"""
     if _type is None:
@@ -60,6 +110,10 @@ def import_chat_llm(llm: str) -> BaseChatModel:
 
 def import_memory(memory: str) -> Any:
     """Import memory from memory name"""
+    from langflow.interface.custom_lists import memory_type_to_cls_dict
+
+    if memory in memory_type_to_cls_dict:
+        return memory_type_to_cls_dict[memory]
     return import_module(f"from langchain.memory import {memory}")
 
 
@@ -88,6 +142,10 @@ def import_wrapper(wrapper: str) -> Any:
 
 def import_toolkit(toolkit: str) -> Any:
     """Import toolkit from toolkit name"""
+    from langflow.interface.custom_lists import toolkit_type_to_cls_dict
+
+    if toolkit in toolkit_type_to_cls_dict:
+        return toolkit_type_to_cls_dict[toolkit]
     return import_module(f"from langchain.agents.agent_toolkits import {toolkit}")
 
 
@@ -116,24 +174,39 @@ def import_tool(tool: str) -> BaseTool:
 def import_chain(chain: str) -> Type[Chain]:
     """Import chain from chain name"""
     from langflow.interface.chains.custom import CUSTOM_CHAINS
+    from langflow.interface.custom_lists import chain_type_to_cls_dict
 
     if chain in CUSTOM_CHAINS:
         return CUSTOM_CHAINS[chain]
+    if chain in chain_type_to_cls_dict:
+        return chain_type_to_cls_dict[chain]
     return import_class(f"langchain.chains.{chain}")
 
 
 def import_embedding(embedding: str) -> Any:
     """Import embedding from embedding name"""
+    from langflow.interface.custom_lists import embedding_type_to_cls_dict
+
+    if embedding in embedding_type_to_cls_dict:
+        return embedding_type_to_cls_dict[embedding]
     return import_class(f"langchain.embeddings.{embedding}")
 
 
 def import_vectorstore(vectorstore: str) -> Any:
     """Import vectorstore from vectorstore name"""
+    from langflow.interface.custom_lists import vectorstore_type_to_cls_dict
+
+    if vectorstore in vectorstore_type_to_cls_dict:
+        return vectorstore_type_to_cls_dict[vectorstore]
     return import_class(f"langchain.vectorstores.{vectorstore}")
 
 
 def import_documentloader(documentloader: str) -> Any:
     """Import documentloader from documentloader name"""
+    from langflow.interface.custom_lists import documentloaders_type_to_cls_dict
+
+    if documentloader in documentloaders_type_to_cls_dict:
+        return documentloaders_type_to_cls_dict[documentloader]
     return import_class(f"langchain.document_loaders.{documentloader}")
 
 
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Mapping, Optional, Type
 
 from langflow.interface.base import LangChainTypeCreator
 from langflow.interface.custom_lists import llm_type_to_cls_dict
@@ -16,7 +16,7 @@ class LLMCreator(LangChainTypeCreator):
         return LLMFrontendNode
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
             self.type_dict = llm_type_to_cls_dict
         return self.type_dict
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Mapping, Optional, Type
 
 from langflow.interface.base import LangChainTypeCreator
 from langflow.interface.custom_lists import memory_type_to_cls_dict
@@ -18,7 +18,7 @@ class MemoryCreator(LangChainTypeCreator):
         return MemoryFrontendNode
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
             self.type_dict = memory_type_to_cls_dict
         return self.type_dict
@@ -35,9 +35,9 @@ class MemoryCreator(LangChainTypeCreator):
 
     def to_list(self) -> List[str]:
         return [
-            memory.__name__
-            for memory in self.type_to_loader_dict.values()
-            if memory.__name__ in settings.memories or settings.dev
+            memory
+            for memory in self.type_to_loader_dict.keys()
+            if memory in settings.memories or settings.dev
         ]
 
 
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Mapping, Optional, Type
 
 from langchain import prompts
 
@@ -19,7 +19,7 @@ class PromptCreator(LangChainTypeCreator):
         return PromptFrontendNode
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
             self.type_dict = {
                 prompt_name: import_class(f"langchain.prompts.{prompt_name}")
@@ -1,14 +1,55 @@
-import contextlib
-import io
-from typing import Any, Dict, List, Tuple
+import asyncio
+import copy
+import functools
+import operator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 from langchain.schema import AgentAction
-
-from langflow.api.callback import AsyncStreamingLLMCallbackHandler, StreamingLLMCallbackHandler  # type: ignore
+from pydantic import BaseModel
+
+from langflow.api.callback import (  # type: ignore
+    AsyncStreamingLLMCallbackHandler,
+    AsyncThoughtCallbackHandler,
+    QueueSender,
+    StreamingLLMCallbackHandler,
+    ThoughtCallbackHandler,
+    ThoughtRecorder,
+)
+from langflow.api.schemas import ChatResponse
+from langflow.cache.backends import ConfiguredCache
 from langflow.cache.base import compute_dict_hash, load_cache, memoize_dict
+from langflow.cache.blobs import blob_store, release_blobs
 from langflow.graph.graph import Graph
+from langflow.interface.utils import try_setting_streaming_options
+from langflow.settings import settings
 from langflow.utils.logger import logger
 
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the thread pool that runs blocking work off the event loop."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.sync_workers,
+                    thread_name_prefix="langflow-sync",
+                )
+    return _executor
+
+
+async def run_in_executor(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function on the thread pool and wait for it."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
 
 def load_langchain_object(data_graph, is_first_message=False):
     """
@@ -29,11 +70,67 @@ def load_or_build_langchain_object(data_graph, is_first_message=False):
     Load langchain object from cache if it exists, otherwise build it.
     """
     if is_first_message:
-        build_langchain_object_with_caching.clear_cache()
+        # Only this flow is rebuilt, other flows stay cached
+        build_langchain_object_with_caching.evict(data_graph)
     return build_langchain_object_with_caching(data_graph)
 
 
-@memoize_dict(maxsize=10)
+# The langchain object of each chat session, keyed by client id, along
+# with the hash of the flow it was built from. Every client gets its
+# own instance, so they don't share memory. With the shared backend,
+# any worker can carry on a session started by another one. Each
+# session holds the files of its flow until it's removed
+session_objects = ConfiguredCache(
+    "session_objects", maxsize=100, on_remove=release_blobs("session_objects")
+)
+
+
+def load_or_build_session(
+    client_id: str, data_graph: Dict[str, Any], is_first_message=False
+) -> Tuple[str, Any]:
+    """
+    Load the langchain object of a chat session if it was built from the
+    same flow, otherwise build a new one for that session only. Returns
+    the hash of the flow with the object, to save the session with.
+    """
+    # A flow_hash sent by the client is ignored, it may be stale
+    flow_hash = compute_dict_hash(data_graph)
+    if is_first_message:
+        session_objects.pop(client_id)
+    else:
+        cached = session_objects.get(client_id)
+        if cached is not None and cached[0] == flow_hash:
+            return flow_hash, cached[1]
+
+    langchain_object = build_langchain_object(data_graph)
+    session_objects.set(client_id, (flow_hash, langchain_object))
+    blob_store.hold(("session_objects", client_id), blob_store.flow_digests(data_graph))
+    return flow_hash, langchain_object
+
+
+def load_or_build_session_object(
+    client_id: str, data_graph: Dict[str, Any], is_first_message=False
+):
+    """Same as load_or_build_session, without the hash."""
+    return load_or_build_session(client_id, data_graph, is_first_message)[1]
+
+
+def save_session_object(client_id: str, flow_hash: str, langchain_object):
+    """
+    Save a session's object after a message, so its memory is kept, with
+    the hash load_or_build_session returned for it.
+    """
+    session_objects.set(client_id, (flow_hash, langchain_object))
+
+
+@memoize_dict(
+    cache=ConfiguredCache(
+        "build_langchain_object_with_caching",
+        maxsize=10,
+        # Keyed by the hash of the flow, as built by memoize_dict
+        on_remove=release_blobs("built_flows", holder_key=operator.itemgetter(1)),
+    )
+)
 def build_langchain_object_with_caching(data_graph):
     """
     Build langchain object from data_graph.
@@ -41,7 +138,12 @@ def build_langchain_object_with_caching(data_graph):
 
     logger.debug("Building langchain object")
     graph = build_graph(data_graph)
-    return graph.build()
+    langchain_object = graph.build()
+    blob_store.hold(
+        ("built_flows", compute_dict_hash(data_graph)),
+        blob_store.flow_digests(data_graph),
+    )
+    return langchain_object
 
 
 def build_graph(data_graph):
@@ -89,6 +191,188 @@ def process_graph_cached(data_graph: Dict[str, Any], message: str):
     return {"result": str(result), "thought": thought.strip()}
 
 
+async def aload_langchain_object(data_graph: Dict[str, Any]):
+    """Load or build the langchain object of a flow on the thread pool."""
+    is_first_message = len(data_graph.get("chatHistory", [])) == 0
+    langchain_object = await run_in_executor(
+        load_or_build_langchain_object, data_graph, is_first_message
+    )
+    logger.debug("Loaded langchain object")
+
+    if langchain_object is None:
+        # Raise user facing error
+        raise ValueError(
+            "There was an error loading the langchain_object. Please, check all the nodes and try again."
+        )
+    return langchain_object
+
+
+async def aprocess_graph_cached(data_graph: Dict[str, Any], message: str):
+    """
+    Same as process_graph_cached, without blocking the event loop.
+
+    The graph is built on the thread pool and the result is generated
+    with acall, or on the thread pool for chains that are sync only.
+    """
+    langchain_object = await aload_langchain_object(data_graph)
+
+    logger.debug("Generating result and thought")
+    result, thought = await aget_result_and_thought(langchain_object, message)
+    logger.debug("Generated result and thought")
+    return {"result": str(result), "thought": thought.strip()}
+
+
+async def aprocess_registered_flow(flow_id: str, message: str):
+    """Run a message through a flow registered in the flow registry."""
+    from langflow.interface.flows import flow_registry
+
+    langchain_object = await run_in_executor(flow_registry.get_object, flow_id)
+    logger.debug("Generating result and thought")
+    result, thought = await aget_result_and_thought(langchain_object, message)
+    return {"result": str(result), "thought": thought.strip()}
+
+
+def _shallow_copy(obj):
+    copied = copy.copy(obj)
+    if isinstance(obj, BaseModel):
+        # copy.copy shares the __dict__ of pydantic models, and their own
+        # copy leaves out excluded fields such as callbacks
+        object.__setattr__(copied, "__dict__", dict(obj.__dict__))
+    return copied
+
+
+def copy_for_run(langchain_object):
+    """
+    Get a shallow copy of a cached object with its own llm, so that a run
+    can change their options without changing them for other callers.
+    The memory and the other parts are still shared.
+    """
+    run_object = _shallow_copy(langchain_object)
+    if getattr(run_object, "llm", None) is not None:
+        run_object.llm = _shallow_copy(run_object.llm)
+    elif getattr(getattr(run_object, "llm_chain", None), "llm", None) is not None:
+        run_object.llm_chain = _shallow_copy(run_object.llm_chain)
+        run_object.llm_chain.llm = _shallow_copy(run_object.llm_chain.llm)
+    return run_object
+
+
+async def astream_result(langchain_object, message: str) -> AsyncIterator[Dict]:
+    """
+    Run a message through a langchain object, yielding its tokens as
+    stream responses as they are generated, then an end response with
+    the result and intermediate steps, or an error response.
+
+    The object may be shared, so the run streams from a copy of it.
+    """
+    sender = QueueSender()
+    langchain_object = try_setting_streaming_options(
+        copy_for_run(langchain_object), sender
+    )
+
+    async def produce():
+        try:
+            result, intermediate_steps = await get_result_and_steps(
+                langchain_object, message, websocket=sender
+            )
+            response = ChatResponse(
+                message=str(result),
+                intermediate_steps=(intermediate_steps or "").strip(),
+                type="end",
+            )
+        except Exception as exc:
+            logger.exception(exc)
+            response = ChatResponse(
+                message=str(exc), intermediate_steps="", type="error"
+            )
+        await sender.send_json(response.dict())
+        await sender.close()
+
+    task = asyncio.create_task(produce())
+    try:
+        async for data in sender:
+            yield data
+    finally:
+        # Stop generating if the client went away
+        task.cancel()
+
+
+async def aprocess_graph_batch(
+    data_graph: Dict[str, Any], messages: List[str], concurrency: int = 1
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Run many messages through one flow, yielding (index, response) pairs
+    as they finish. A response has a result and a thought, or an error.
+
+    Flows without memory share the cached object. Flows with memory get
+    one object per concurrent run, built for the batch, whose memory is
+    cleared before each message so that messages don't see each other.
+    If no copy can be built, the messages run one at a time on the cached
+    object, without clearing its memory, which other callers may use.
+    """
+    if not messages:
+        return
+    langchain_object = await run_in_executor(load_or_build_langchain_object, data_graph)
+    if langchain_object is None:
+        raise ValueError(
+            "There was an error loading the langchain_object. Please, check all the nodes and try again."
+        )
+    has_memory = getattr(langchain_object, "memory", None) is not None
+
+    workers_count = max(1, min(concurrency, len(messages)))
+    worker_objects = [langchain_object] * workers_count
+    clear_memory = False
+    if has_memory:
+        copies = await asyncio.gather(
+            *(
+                run_in_executor(build_langchain_object, data_graph)
+                for _ in range(workers_count)
+            ),
+            return_exceptions=True,
+        )
+        for copy in copies:
+            if isinstance(copy, BaseException):
+                logger.warning(f"Could not build a copy of the flow: {copy}")
+        worker_objects = [
+            copy
+            for copy in copies
+            if copy is not None and not isinstance(copy, BaseException)
+        ]
+        clear_memory = bool(worker_objects)
+        if not worker_objects:
+            worker_objects = [langchain_object]
+
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(messages):
+        pending.put_nowait(item)
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def worker(worker_object):
+        while True:
+            try:
+                index, message = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                if clear_memory:
+                    worker_object.memory.clear()
+                result, thought = await aget_result_and_thought(worker_object, message)
+                response = {"result": str(result), "thought": thought.strip()}
+            except Exception as exc:
+                logger.debug(f"Error in message {index} of batch: {exc}")
+                response = {"error": str(exc)}
+            await finished.put((index, response))
+
+    workers = [
+        asyncio.create_task(worker(worker_object)) for worker_object in worker_objects
+    ]
+    try:
+        for _ in messages:
+            yield await finished.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
 def get_memory_key(langchain_object):
     """
     Given a LangChain object, this function retrieves the current memory key from the object's memory attribute.
@@ -156,17 +440,7 @@ async def get_result_and_steps(langchain_object, message: str, **kwargs):
     try:
         if hasattr(langchain_object, "verbose"):
             langchain_object.verbose = True
-        chat_input = None
-        memory_key = ""
-        if hasattr(langchain_object, "memory") and langchain_object.memory is not None:
-            memory_key = langchain_object.memory.memory_key
-
-        if hasattr(langchain_object, "input_keys"):
-            for key in langchain_object.input_keys:
-                if key not in [memory_key, "chat_history"]:
-                    chat_input = {key: message}
-        else:
-            chat_input = message  # type: ignore
+        chat_input = get_chat_input(langchain_object, message)
 
         if hasattr(langchain_object, "return_intermediate_steps"):
             # https://github.com/hwchase17/langchain/issues/2068
@@ -176,45 +450,125 @@ async def get_result_and_steps(langchain_object, message: str, **kwargs):
 
         fix_memory_inputs(langchain_object)
         try:
-            async_callbacks = [AsyncStreamingLLMCallbackHandler(**kwargs)]
-            output = await langchain_object.acall(chat_input, callbacks=async_callbacks)
+            stream_handler = AsyncStreamingLLMCallbackHandler(**kwargs)
+            try:
+                output = await langchain_object.acall(
+                    chat_input, callbacks=[stream_handler]
+                )
+            except asyncio.CancelledError:
+                stream_handler.cancel()
+                raise
+            finally:
+                # Send the tokens that are still buffered
+                await stream_handler.flush()
         except Exception as exc:
             # make the error message more informative
             logger.debug(f"Error: {str(exc)}")
-            sync_callbacks = [StreamingLLMCallbackHandler(**kwargs)]
-            output = langchain_object(chat_input, callbacks=sync_callbacks)
-
-        intermediate_steps = (
-            output.get("intermediate_steps", []) if isinstance(output, dict) else []
-        )
+            output = await arun_sync_streaming(langchain_object, chat_input, **kwargs)
 
-        result = (
-            output.get(langchain_object.output_keys[0])
-            if isinstance(output, dict)
-            else output
-        )
-        thought = format_actions(intermediate_steps) if intermediate_steps else ""
+        result, thought = get_result_from_output(langchain_object, output)
     except Exception as exc:
         raise ValueError(f"Error: {str(exc)}") from exc
     return result, thought
 
 
+async def arun_sync_streaming(langchain_object, chat_input, **kwargs):
+    """
+    Run a sync chain on the thread pool, streaming its tokens from the
+    event loop.
+    """
+    stream_handler = StreamingLLMCallbackHandler(**kwargs)
+    drain = asyncio.create_task(stream_handler.drain())
+
+    def run():
+        try:
+            return langchain_object(chat_input, callbacks=[stream_handler])
+        finally:
+            stream_handler.close()
+
+    future = asyncio.ensure_future(run_in_executor(run))
+    try:
+        output = await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # The thread can't be stopped, but its tokens are dropped. The
+        # run ends with the thread, so the chain isn't used by two runs
+        drain.cancel()
+        await asyncio.wait({future})
+        raise
+    except Exception:
+        await drain
+        raise
+    # Send the last tokens before the result
+    await drain
+    return output
+
+
+def get_chat_input(langchain_object, message: str):
+    """Get the input of the langchain object that the message goes to."""
+    chat_input = None
+    memory_key = ""
+    if hasattr(langchain_object, "memory") and langchain_object.memory is not None:
+        memory_key = langchain_object.memory.memory_key
+
+    if hasattr(langchain_object, "input_keys"):
+        for key in langchain_object.input_keys:
+            if key not in [memory_key, "chat_history"]:
+                chat_input = {key: message}
+    else:
+        chat_input = message  # type: ignore
+    return chat_input
+
+
+def get_result_from_output(
+    langchain_object, output, recorder: Optional[ThoughtRecorder] = None
+) -> Tuple[Any, str]:
+    """
+    Get the result of a chain's output and its thought, which are the
+    intermediate steps if there are any, or the steps the recorder saw.
+    """
+    intermediate_steps = (
+        output.get("intermediate_steps", []) if isinstance(output, dict) else []
+    )
+    result = (
+        output.get(langchain_object.output_keys[0])
+        if isinstance(output, dict)
+        else output
+    )
+    if intermediate_steps:
+        thought = format_actions(intermediate_steps)
+    elif recorder is not None:
+        thought = recorder.format()
+    else:
+        thought = ""
+    return result, thought
+
+
+async def aget_result_and_thought(langchain_object, message: str):
+    """
+    Get result and thought with acall, falling back to get_result_and_thought
+    on the thread pool for chains that don't support async.
+    """
+    if not hasattr(langchain_object, "acall"):
+        return await run_in_executor(get_result_and_thought, langchain_object, message)
+    try:
+        chat_input = get_chat_input(langchain_object, message)
+        if hasattr(langchain_object, "return_intermediate_steps"):
+            langchain_object.return_intermediate_steps = False
+        fix_memory_inputs(langchain_object)
+        recorder = AsyncThoughtCallbackHandler()
+        output = await langchain_object.acall(chat_input, callbacks=[recorder])
+    except NotImplementedError:
+        logger.debug(f"{type(langchain_object).__name__} is sync only")
+        return await run_in_executor(get_result_and_thought, langchain_object, message)
+    except Exception as exc:
+        raise ValueError(f"Error: {str(exc)}") from exc
+    return get_result_from_output(langchain_object, output, recorder)
+
+
 def get_result_and_thought(langchain_object, message: str):
     """Get result and thought from extracted json"""
     try:
-        if hasattr(langchain_object, "verbose"):
-            langchain_object.verbose = True
-        chat_input = None
-        memory_key = ""
-        if hasattr(langchain_object, "memory") and langchain_object.memory is not None:
-            memory_key = langchain_object.memory.memory_key
-
-        if hasattr(langchain_object, "input_keys"):
-            for key in langchain_object.input_keys:
-                if key not in [memory_key, "chat_history"]:
-                    chat_input = {key: message}
-        else:
-            chat_input = message  # type: ignore
+        chat_input = get_chat_input(langchain_object, message)
 
         if hasattr(langchain_object, "return_intermediate_steps"):
             # https://github.com/hwchase17/langchain/issues/2068
@@ -224,31 +578,18 @@ def get_result_and_thought(langchain_object, message: str):
 
         fix_memory_inputs(langchain_object)
 
-        with io.StringIO() as output_buffer, contextlib.redirect_stdout(output_buffer):
-            try:
-                # if hasattr(langchain_object, "acall"):
-                #     output = await langchain_object.acall(chat_input)
-                # else:
-                output = langchain_object(chat_input)
-            except ValueError as exc:
-                # make the error message more informative
-                logger.debug(f"Error: {str(exc)}")
-                output = langchain_object.run(chat_input)
-
-            intermediate_steps = (
-                output.get("intermediate_steps", []) if isinstance(output, dict) else []
-            )
-
-            result = (
-                output.get(langchain_object.output_keys[0])
-                if isinstance(output, dict)
-                else output
-            )
-            if intermediate_steps:
-                thought = format_actions(intermediate_steps)
-            else:
-                thought = output_buffer.getvalue()
+        # The thought is recorded by a handler of this call only,
+        # instead of capturing the verbose output of the process
+        recorder = ThoughtCallbackHandler()
+        try:
+            output = langchain_object(chat_input, callbacks=[recorder])
+        except ValueError as exc:
+            # make the error message more informative
+            logger.debug(f"Error: {str(exc)}")
+            recorder = ThoughtCallbackHandler()
+            output = langchain_object.run(chat_input, callbacks=[recorder])
 
+        result, thought = get_result_from_output(langchain_object, output, recorder)
     except Exception as exc:
         raise ValueError(f"Error: {str(exc)}") from exc
     return result, thought
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 
 from langflow.interface.base import LangChainTypeCreator
 from langflow.interface.custom_lists import textsplitter_type_to_cls_dict
@@ -11,7 +11,7 @@ class TextSplitterCreator(LangChainTypeCreator):
     type_name: str = "textsplitters"
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         return textsplitter_type_to_cls_dict
 
     def get_signature(self, name: str) -> Optional[Dict]:
@@ -1,9 +1,10 @@
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Mapping, Optional
 
 from langchain.agents import agent_toolkits
 
 from langflow.interface.base import LangChainTypeCreator
-from langflow.interface.importing.utils import import_class, import_module
+from langflow.interface.custom_lists import toolkit_type_to_cls_dict
+from langflow.interface.importing.utils import import_module
 from langflow.settings import settings
 from langflow.utils.logger import logger
 from langflow.utils.util import build_template_from_class
@@ -27,16 +28,13 @@ class ToolkitCreator(LangChainTypeCreator):
     }
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
-            self.type_dict = {
-                toolkit_name: import_class(
-                    f"langchain.agents.agent_toolkits.{toolkit_name}"
-                )
-                # if toolkit_name is not lower case it is a class
-                for toolkit_name in agent_toolkits.__all__
-                if not toolkit_name.islower() and toolkit_name in settings.toolkits
-            }
+            self.type_dict = toolkit_type_to_cls_dict.subset(
+                toolkit_name
+                for toolkit_name in toolkit_type_to_cls_dict
+                if toolkit_name in settings.toolkits
+            )
 
         return self.type_dict
 
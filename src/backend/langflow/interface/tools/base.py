@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 
 from langchain.agents.load_tools import (
     _EXTRA_LLM_TOOLS,
@@ -65,7 +65,7 @@ class ToolCreator(LangChainTypeCreator):
     tools_dict: Optional[Dict] = None
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.tools_dict is None:
             all_tools = {}
 
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Mapping, Optional, Type
 
 from langchain import SQLDatabase, utilities
 
@@ -19,7 +19,7 @@ class UtilityCreator(LangChainTypeCreator):
         return UtilitiesFrontendNode
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         """
         Returns a dictionary mapping utility names to their corresponding loader classes.
         If the dictionary has not been created yet, it is created by importing all utility classes
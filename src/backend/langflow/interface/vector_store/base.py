@@ -1,9 +1,7 @@
-from typing import Any, Dict, List, Optional, Type
-
-from langchain import vectorstores
+from typing import Dict, List, Mapping, Optional, Type
 
 from langflow.interface.base import LangChainTypeCreator
-from langflow.interface.importing.utils import import_class
+from langflow.interface.custom_lists import vectorstore_type_to_cls_dict
 from langflow.settings import settings
 from langflow.template.frontend_node.vectorstores import VectorStoreFrontendNode
 from langflow.utils.logger import logger
@@ -18,14 +16,9 @@ class VectorstoreCreator(LangChainTypeCreator):
         return VectorStoreFrontendNode
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
-            self.type_dict: dict[str, Any] = {
-                vectorstore_name: import_class(
-                    f"langchain.vectorstores.{vectorstore_name}"
-                )
-                for vectorstore_name in vectorstores.__all__
-            }
+            self.type_dict = vectorstore_type_to_cls_dict
         return self.type_dict
 
     def get_signature(self, name: str) -> Optional[Dict]:
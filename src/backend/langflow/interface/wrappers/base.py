@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 
 from langchain import requests
 
@@ -11,7 +11,7 @@ class WrapperCreator(LangChainTypeCreator):
     type_name: str = "wrappers"
 
     @property
-    def type_to_loader_dict(self) -> Dict:
+    def type_to_loader_dict(self) -> Mapping:
         if self.type_dict is None:
             self.type_dict = {
                 wrapper.__name__: wrapper for wrapper in [requests.TextRequestsWrapper]
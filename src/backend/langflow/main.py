@@ -1,9 +1,14 @@
+import asyncio
+import contextlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from langflow.api.chat import chat_manager
 from langflow.api.chat import router as chat_router
 from langflow.api.endpoints import router as endpoints_router
 from langflow.api.validate import router as validate_router
+from langflow.interface.catalog import component_catalog
 
 
 def create_app():
@@ -25,6 +30,22 @@ def create_app():
     app.include_router(endpoints_router)
     app.include_router(validate_router)
     app.include_router(chat_router)
+
+    @app.on_event("startup")
+    def warm_up_catalog():
+        # Build the component catalog before the first /all request
+        component_catalog.get()
+
+    @app.on_event("startup")
+    async def start_session_expiry():
+        app.state.session_expiry = asyncio.create_task(chat_manager.expire_sessions())
+
+    @app.on_event("shutdown")
+    async def stop_session_expiry():
+        app.state.session_expiry.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await app.state.session_expiry
+
     return app
 
 
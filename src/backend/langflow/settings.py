@@ -1,8 +1,10 @@
+import hashlib
+import json
 import os
-from typing import List
+from typing import List, Optional
 
 import yaml
-from pydantic import BaseSettings, root_validator
+from pydantic import BaseSettings, Field, root_validator
 
 
 class Settings(BaseSettings):
@@ -20,6 +22,35 @@ class Settings(BaseSettings):
     textsplitters: List[str] = []
     utilities: List[str] = []
     dev: bool = False
+    # Maximum number of graph nodes built at the same time
+    build_concurrency: int = 1
+    # Maximum number of builds and sync only chains run at the same time
+    # off the event loop
+    sync_workers: int = 4
+    # Maximum number of messages of a batch processed at the same time
+    batch_concurrency: int = 4
+    # Where built objects are cached on disk. Workers that share it
+    # share their cache. Defaults to a folder in the temp directory
+    cache_dir: Optional[str] = Field(None, env="LANGFLOW_CACHE_DIR")
+    cache_max_bytes: int = 512 * 1024**2
+    cache_max_entries: int = 64
+    # Where built flows and chat sessions are kept: "memory" keeps them in
+    # each worker, "shared" shares them between the workers of a machine
+    cache_backend: str = Field("memory", env="LANGFLOW_CACHE_BACKEND")
+    # Defaults to /dev/shm when available
+    shared_cache_dir: Optional[str] = Field(None, env="LANGFLOW_SHARED_CACHE_DIR")
+    # Streamed tokens are sent in frames of at most this many tokens, or
+    # of the tokens generated within this many seconds
+    stream_max_tokens: int = 32
+    stream_flush_interval: float = 0.02
+    # Number of recent chat turns kept in memory per client, each with the
+    # message of the client and the response. Older ones are appended to
+    # a log in chat_history_dir, which defaults to a folder in the temp
+    # directory
+    chat_history_max_messages: int = 200
+    chat_history_dir: Optional[str] = None
+    # Seconds after which the history of a disconnected client is removed
+    chat_session_ttl: int = 60 * 60
 
     class Config:
         validate_assignment = True
@@ -28,7 +59,7 @@ class Settings(BaseSettings):
     @root_validator(allow_reuse=True)
     def validate_lists(cls, values):
         for key, value in values.items():
-            if key != "dev" and not value:
+            if isinstance(cls.__fields__[key].default, list) and not value:
                 values[key] = []
         return values
 
@@ -44,8 +75,26 @@ class Settings(BaseSettings):
         self.toolkits = new_settings.toolkits or []
         self.textsplitters = new_settings.textsplitters or []
         self.utilities = new_settings.utilities or []
+        self.build_concurrency = new_settings.build_concurrency
+        self.sync_workers = new_settings.sync_workers
+        self.batch_concurrency = new_settings.batch_concurrency
+        self.cache_dir = new_settings.cache_dir
+        self.cache_max_bytes = new_settings.cache_max_bytes
+        self.cache_max_entries = new_settings.cache_max_entries
+        self.cache_backend = new_settings.cache_backend
+        self.shared_cache_dir = new_settings.shared_cache_dir
+        self.stream_max_tokens = new_settings.stream_max_tokens
+        self.stream_flush_interval = new_settings.stream_flush_interval
+        self.chat_history_max_messages = new_settings.chat_history_max_messages
+        self.chat_history_dir = new_settings.chat_history_dir
+        self.chat_session_ttl = new_settings.chat_session_ttl
         self.dev = dev
 
+    def fingerprint(self) -> str:
+        """Return a stable hash of the current settings state."""
+        settings_json = json.dumps(self.dict(), sort_keys=True)
+        return hashlib.sha256(settings_json.encode("utf-8")).hexdigest()
+
 
 def save_settings_to_yaml(settings: Settings, file_path: str):
     with open(file_path, "w") as f:
@@ -32,12 +32,13 @@ def get_root_node(graph):
     """
     Returns the root node of the template.
     """
-    incoming_edges = {edge.source for edge in graph.edges}
-
-    if not incoming_edges and len(graph.nodes) == 1:
+    if not graph.edges and len(graph.nodes) == 1:
         return graph.nodes[0]
 
-    return next((node for node in graph.nodes if node not in incoming_edges), None)
+    # The root is the node that is not the source of any edge
+    return next(
+        (node for node in graph.nodes if not graph.get_nodes_with_source(node)), None
+    )
 
 
 def build_json(root, graph) -> Dict:
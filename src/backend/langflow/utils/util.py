@@ -2,7 +2,7 @@ import importlib
 import inspect
 import re
 from functools import wraps
-from typing import Dict, Optional
+from typing import Any, Dict, Mapping, Optional
 
 from docstring_parser import parse  # type: ignore
 
@@ -64,17 +64,29 @@ def build_template_from_function(
             }
 
 
-def build_template_from_class(
-    name: str, type_to_cls_dict: Dict, add_function: bool = False
-):
+def iter_classes_by_name(name: str, type_to_cls_dict: Mapping[str, Any]):
+    """
+    Get the (type, class) pairs that may match a class name.
+
+    If the name is a key of the dict only that class is returned, so lazy
+    registries don't need to import every class to find it.
+    """
+    if name in type_to_cls_dict:
+        return [(name, type_to_cls_dict[name])]
+
     classes = [item.__name__ for item in type_to_cls_dict.values()]
 
-    # Raise error if name is not in chains
+    # Raise error if name is not in the dict
     if name not in classes:
         raise ValueError(f"{name} not found.")
+    return type_to_cls_dict.items()
 
-    for _type, v in type_to_cls_dict.items():
-        if v.__name__ == name:
+
+def build_template_from_class(
+    name: str, type_to_cls_dict: Mapping[str, Any], add_function: bool = False
+):
+    for _type, v in iter_classes_by_name(name, type_to_cls_dict):
+        if v.__name__ == name or _type == name:
             _class = v
 
             # Get the docstring
@@ -120,17 +132,11 @@ def build_template_from_class(
 def build_template_from_method(
     class_name: str,
     method_name: str,
-    type_to_cls_dict: Dict,
+    type_to_cls_dict: Mapping[str, Any],
     add_function: bool = False,
 ):
-    classes = [item.__name__ for item in type_to_cls_dict.values()]
-
-    # Raise error if class_name is not in classes
-    if class_name not in classes:
-        raise ValueError(f"{class_name} not found.")
-
-    for _type, v in type_to_cls_dict.items():
-        if v.__name__ == class_name:
+    for _type, v in iter_classes_by_name(class_name, type_to_cls_dict):
+        if v.__name__ == class_name or _type == class_name:
             _class = v
 
             # Check if the method exists in this class
@@ -24,6 +24,15 @@ def get_text():
     """
 
 
+@pytest.fixture()
+def blob_store(tmp_path, monkeypatch):
+    """The process wide blob store, storing its files in tmp_path."""
+    from langflow.cache.blobs import blob_store
+
+    monkeypatch.setattr(blob_store, "root", tmp_path / "blobs")
+    return blob_store
+
+
 @pytest.fixture()
 async def async_client() -> AsyncGenerator:
     from langflow.main import create_app
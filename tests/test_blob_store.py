@@ -0,0 +1,107 @@
+import base64
+import os
+
+import pytest
+from langflow.cache import blobs
+from langflow.cache.base import save_binary_file
+from langflow.cache.blobs import BlobStore
+from langflow.interface import flows
+
+
+def encode(data: bytes) -> str:
+    return "data:application/pdf;base64," + base64.b64encode(data).decode()
+
+
+def test_put_deduplicates(tmp_path):
+    store = BlobStore(root=tmp_path)
+    first = store.put(b"hello", "a.txt")
+    second = store.put(b"hello", "b.txt")
+    assert first == second
+    assert store.get_path(first, "a.txt").read_bytes() == b"hello"
+    assert store.get_path(first, "b.txt").name == "b.txt"
+    assert store.put(b"other", "a.txt") != first
+
+
+def test_put_encoded_skips_decoding(tmp_path, monkeypatch):
+    store = BlobStore(root=tmp_path)
+    content = encode(b"file content")
+    digest = store.put_encoded(content, "file.pdf")
+
+    def fail(content):
+        raise AssertionError("Content should not be decoded again")
+
+    monkeypatch.setattr(blobs, "decode_content", fail)
+    assert store.put_encoded(content, "file.pdf") == digest
+
+
+def test_resolve_reference(tmp_path):
+    store = BlobStore(root=tmp_path)
+    digest = store.put(b"file content", "file.pdf")
+    path = store.resolve(store.reference(digest), "file.pdf")
+    assert path.read_bytes() == b"file content"
+    with pytest.raises(ValueError):
+        store.resolve(store.reference("0" * 64), "file.pdf")
+    with pytest.raises(ValueError):
+        store.resolve(store.reference("../../etc"), "file.pdf")
+
+
+def test_file_names_stay_in_store(tmp_path):
+    store = BlobStore(root=tmp_path / "blobs")
+    digest = store.put(b"data", "../../outside.txt")
+    path = store.get_path(digest, "../../outside.txt")
+    assert path.parent.parent == tmp_path / "blobs"
+
+
+def test_eviction_skips_pinned_blobs(tmp_path):
+    store = BlobStore(root=tmp_path, max_bytes=150)
+    pinned = store.put(b"a" * 100, "a.txt")
+    store.pin(pinned)
+    old_mtime = (tmp_path / pinned).stat().st_mtime - 10
+    os.utime(tmp_path / pinned, (old_mtime, old_mtime))
+    unpinned = store.put(b"b" * 100, "b.txt")
+    latest = store.put(b"c" * 100, "c.txt")
+    assert (tmp_path / pinned).exists()
+    assert not (tmp_path / unpinned).exists()
+    assert (tmp_path / latest).exists()
+
+    store.unpin(pinned)
+    store.evict()
+    assert not (tmp_path / pinned).exists()
+
+
+def test_save_binary_file(blob_store, tmp_path):
+    content = encode(b"%PDF-1.4")
+    path = save_binary_file(content, "file.pdf", [".pdf"])
+    assert path.startswith(str(tmp_path / "blobs"))
+    assert open(path, "rb").read() == b"%PDF-1.4"
+    digest = blob_store.digest_of(path)
+    assert save_binary_file(blob_store.reference(digest), "file.pdf", [".pdf"]) == path
+    with pytest.raises(ValueError):
+        save_binary_file(content, "file.exe", [".pdf"])
+
+
+def test_registered_flow_holds_its_blobs(blob_store, monkeypatch):
+    monkeypatch.setattr(blob_store, "max_bytes", 150)
+    monkeypatch.setattr(flows, "build_langchain_object", lambda data_graph: object())
+    digest = blob_store.put(b"a" * 100, "a.txt")
+    old_mtime = (blob_store.root / digest).stat().st_mtime - 10
+    os.utime(blob_store.root / digest, (old_mtime, old_mtime))
+    file_field = {
+        "type": "file",
+        "value": "a.txt",
+        "content": blob_store.reference(digest),
+    }
+    data_graph = {
+        "nodes": [{"data": {"node": {"template": {"file_path": file_field}}}}],
+        "edges": [],
+    }
+
+    registry = flows.FlowRegistry()
+    registry.register("flow", data_graph)
+    # The object built from the flow may still read the file
+    blob_store.put(b"b" * 100, "b.txt")
+    assert (blob_store.root / digest).exists()
+
+    registry.remove("flow")
+    blob_store.evict()
+    assert not (blob_store.root / digest).exists()
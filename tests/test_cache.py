@@ -1,10 +1,32 @@
+import asyncio
 import json
+import os
+import subprocess
+import sys
+import time
 
 import pytest
+from langflow.api import chat_manager
+from langflow.cache import cache_manager
+from langflow.api.schemas import ChatMessage
+from langflow.cache.backends import ConfiguredCache, SharedCache
+from langflow.cache.base import (
+    LRUCache,
+    approximate_size,
+    compute_dict_hash,
+    load_cache,
+    save_cache,
+)
+from langflow.cache.disk import DiskCache
+from langflow.interface import run
+from langflow.interface.flows import FlowRegistry
+from langflow.settings import settings
 from langflow.interface.run import (
     build_graph,
     build_langchain_object_with_caching,
     load_or_build_langchain_object,
+    load_or_build_session_object,
+    session_objects,
 )
 
 
@@ -53,6 +75,30 @@ def test_load_or_build_langchain_object_first_message_false(basic_data_graph):
     assert graph is not None
 
 
+def test_first_message_only_evicts_its_flow(basic_data_graph, complex_data_graph):
+    build_langchain_object_with_caching.clear_cache()
+    build_langchain_object_with_caching(complex_data_graph)
+    load_or_build_langchain_object(basic_data_graph, is_first_message=True)
+    assert len(build_langchain_object_with_caching.cache) == 2
+
+
+def test_session_objects_are_isolated(basic_data_graph):
+    session_objects.clear()
+    first = load_or_build_session_object("a", basic_data_graph, is_first_message=True)
+    second = load_or_build_session_object("b", basic_data_graph, is_first_message=True)
+    # Each client has its own instance and memory
+    assert first is not second
+    assert first.memory is not second.memory
+    assert load_or_build_session_object("a", basic_data_graph) is first
+    # A new chat for one client doesn't rebuild the other client's object
+    new_first = load_or_build_session_object(
+        "a", basic_data_graph, is_first_message=True
+    )
+    assert new_first is not first
+    assert load_or_build_session_object("b", basic_data_graph) is second
+    session_objects.clear()
+
+
 # Test build_langchain_object_with_caching
 def test_build_langchain_object_with_caching(basic_data_graph):
     build_langchain_object_with_caching.clear_cache()
@@ -82,3 +128,336 @@ def test_cache_size_limit(basic_data_graph):
         build_langchain_object_with_caching(modified_data_graph_new_id)
 
     assert len(build_langchain_object_with_caching.cache) == 10
+
+
+def test_lru_cache_promotes_hits():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_lru_cache_ttl(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["misses"] == 1
+    assert len(cache) == 0
+
+
+def test_lru_cache_max_bytes():
+    cache = LRUCache(maxsize=100, max_bytes=250, sizeof=len)
+    cache.set("a", b"x" * 100)
+    cache.set("b", b"x" * 100)
+    cache.set("c", b"x" * 100)
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 200
+    # A single entry over the limit is still kept
+    cache.set("d", b"x" * 300)
+    assert list(cache) == ["d"]
+
+
+def test_lru_cache_on_remove():
+    removed = []
+    cache = LRUCache(maxsize=2, on_remove=lambda key, value: removed.append(key))
+    cache.set("a", 1)
+    cache.set("a", 2)
+    # Replacing an entry doesn't remove it
+    assert removed == []
+    cache.set("b", 1)
+    cache.set("c", 1)
+    assert removed == ["a"]
+    cache.pop("b")
+    cache.clear()
+    assert removed == ["a", "b", "c"]
+
+
+def test_approximate_size_counts_referenced_objects(basic_data_graph):
+    langchain_object = build_langchain_object_with_caching(basic_data_graph)
+    assert approximate_size(langchain_object) > 1000
+    assert approximate_size({"key": [str(i) * 1000 for i in range(10)]}) > 10000
+    assert approximate_size(b"x" * 100) == 100
+    # Values that can't be pickled are still measured
+    assert approximate_size([Unpicklable()]) > 0
+
+
+def test_memoize_dict_stats(basic_data_graph):
+    build_langchain_object_with_caching.clear_cache()
+    cache = build_langchain_object_with_caching.cache
+    hits = cache.stats()["hits"]
+    build_langchain_object_with_caching(basic_data_graph)
+    build_langchain_object_with_caching(basic_data_graph)
+    assert cache.stats()["hits"] == hits + 1
+    assert len(cache) == 1
+
+
+def test_compute_dict_hash_leaves_input_untouched(basic_data_graph):
+    original = json.loads(json.dumps(basic_data_graph))
+    compute_dict_hash(basic_data_graph)
+    assert basic_data_graph == original
+
+
+def test_compute_dict_hash_ignores_layout(basic_data_graph):
+    flow_hash = compute_dict_hash(basic_data_graph)
+    moved = json.loads(json.dumps(basic_data_graph))
+    moved["viewport"] = {"x": 100, "y": 100, "zoom": 2}
+    moved["nodes"][0]["position"] = {"x": 0, "y": 0}
+    moved["nodes"][0]["selected"] = True
+    moved["chatHistory"] = [{"message": "Hi"}]
+    assert compute_dict_hash(moved) == flow_hash
+
+    edited = json.loads(json.dumps(basic_data_graph))
+    edited["nodes"][0]["data"]["type"] = "Something else"
+    assert compute_dict_hash(edited) != flow_hash
+
+
+def test_compute_dict_hash_file_content(basic_data_graph):
+    def with_file(content):
+        data = json.loads(json.dumps(basic_data_graph))
+        template = data["nodes"][0]["data"]["node"]["template"]
+        template["file_path"] = {"type": "file", "value": "a.pdf", "content": content}
+        return data
+
+    large, other = "data:;base64," + "a" * 10_000, "data:;base64," + "b" * 10_000
+    flow = with_file(large)
+    assert compute_dict_hash(flow) == compute_dict_hash(with_file(large))
+    assert compute_dict_hash(flow) != compute_dict_hash(with_file(other))
+    assert flow["nodes"][0]["data"]["node"]["template"]["file_path"]["content"] == large
+
+
+def test_session_object_ignores_client_hash(basic_data_graph):
+    session_objects.clear()
+    flow = {**basic_data_graph, "flow_hash": "client-hash"}
+    langchain_object = load_or_build_session_object("a", flow, is_first_message=True)
+    assert session_objects.get("a")[0] == compute_dict_hash(basic_data_graph)
+    assert load_or_build_session_object("a", flow) is langchain_object
+
+    # An edited flow sent with the same stale hash is built again
+    edited = json.loads(json.dumps(flow))
+    edited["nodes"][0]["data"]["node"]["template"]["_edited"] = True
+    assert load_or_build_session_object("a", edited) is not langchain_object
+    session_objects.clear()
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskCache(directory=tmp_path)
+    cache.set("flow", {"answer": 42})
+    assert "flow" in cache
+    # Another process using the same directory sees the entry
+    assert DiskCache(directory=tmp_path).get("flow") == {"answer": 42}
+    assert cache.get("missing") is None
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(directory=tmp_path, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Make "b" the least recently used entry
+    old = time.time() - 100
+    os.utime(cache.path("b"), (old, old))
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_disk_cache_max_bytes(tmp_path):
+    cache = DiskCache(directory=tmp_path, max_bytes=1500)
+    cache.set("a", b"x" * 1000)
+    cache.set("b", b"x" * 1000)
+    assert len(cache) == 1
+    assert cache.get("b") == b"x" * 1000
+
+
+def test_disk_cache_drops_corrupt_entries(tmp_path):
+    cache = DiskCache(directory=tmp_path)
+    cache.path("broken").write_bytes(b"not a pickle")
+    assert cache.get("broken") is None
+    assert "broken" not in cache
+
+
+def test_disk_cache_directory_from_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cache_dir", str(tmp_path))
+    save_cache("flow", [1, 2, 3])
+    assert load_cache("flow") == [1, 2, 3]
+    assert len(list(tmp_path.glob("*.dill"))) == 1
+
+
+def test_shared_cache_backend(basic_data_graph, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cache_backend", "shared")
+    monkeypatch.setattr(settings, "shared_cache_dir", str(tmp_path))
+    session_objects.clear()
+    langchain_object = load_or_build_session_object(
+        "a", basic_data_graph, is_first_message=True
+    )
+    # Other workers read the session from the shared folder
+    other_worker = SharedCache(namespace="session_objects", directory=tmp_path)
+    flow_hash, shared_object = other_worker.get("a")
+    assert flow_hash == compute_dict_hash(basic_data_graph)
+    assert type(shared_object) is type(langchain_object)
+    assert session_objects.stats()["backend"] == "shared"
+
+
+class Unpicklable:
+    def __reduce__(self):
+        raise TypeError("Can't pickle")
+
+
+def test_shared_cache_keeps_unpicklable_values(tmp_path):
+    cache = SharedCache(namespace="objects", directory=tmp_path)
+    value = Unpicklable()
+    cache.set("key", value)
+    # Kept by this worker only
+    assert cache.get("key") is value
+    assert "key" in cache
+    assert SharedCache(namespace="objects", directory=tmp_path).get("key") is None
+    cache.set("key", "shared now")
+    assert cache.get("key") == "shared now"
+    assert len(cache) == 1
+
+
+def test_shared_cache_keys_are_stable_across_processes(tmp_path):
+    key = ("build", "hash", frozenset({("a", 1), ("b", "two"), ("c", None)}))
+    code = (
+        "from pathlib import Path\n"
+        "from langflow.cache.backends import SharedCache\n"
+        f"cache = SharedCache('objects', directory=Path({str(tmp_path)!r}))\n"
+        f"print(cache._key({key!r}))"
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONHASHSEED": str(seed)},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        for seed in (1, 2)
+    }
+    assert keys == {SharedCache("objects", directory=tmp_path)._key(key)}
+
+
+def test_configured_cache_rejects_unknown_backend(monkeypatch):
+    monkeypatch.setattr(settings, "cache_backend", "nowhere")
+    with pytest.raises(ValueError):
+        ConfiguredCache("unknown").get("key")
+
+
+def test_flow_registry_rebuilds_in_other_workers(basic_data_graph):
+    registry = FlowRegistry()
+    flow_hash = registry.register("flow", basic_data_graph)
+    assert registry.get_hash("flow") == flow_hash
+    langchain_object = registry.get_object("flow")
+    assert registry.get_object("flow") is langchain_object
+    # A worker that didn't register the flow builds it from its data
+    registry._objects.clear()
+    assert registry.get_object("flow") is not langchain_object
+    assert registry.remove("flow")
+    with pytest.raises(KeyError):
+        registry.get_object("flow")
+
+
+def test_chat_message_hashes_flow_once(basic_data_graph, monkeypatch):
+    calls = []
+
+    def count_hash(data_graph):
+        calls.append(data_graph)
+        return compute_dict_hash(data_graph)
+
+    async def answer(langchain_object, message, **kwargs):
+        return "answer", ""
+
+    monkeypatch.setattr(run, "compute_dict_hash", count_hash)
+    monkeypatch.setattr(chat_manager, "get_result_and_steps", answer)
+    result = asyncio.run(
+        chat_manager.process_graph(
+            client_id="hash_once",
+            graph_data=basic_data_graph,
+            is_first_message=True,
+            chat_message=ChatMessage(message="hi"),
+            websocket=None,
+        )
+    )
+    assert result == ("answer", "")
+    assert len(calls) == 1
+    assert session_objects.get("hash_once")[0] == compute_dict_hash(basic_data_graph)
+
+
+def test_disk_cache_limits_are_shared_between_processes(tmp_path):
+    # Two workers writing to the same directory
+    first = DiskCache(directory=tmp_path, max_entries=4)
+    second = DiskCache(directory=tmp_path, max_entries=4)
+    first.set("first 0", 0)
+    second.set("second 0", 0)
+    for i in range(1, 3):
+        first.set(f"first {i}", i)
+    for i in range(1, 3):
+        second.set(f"second {i}", i)
+    assert len(first) == 4
+    assert "second 2" in first
+
+    first = DiskCache(directory=tmp_path, max_bytes=2500)
+    second = DiskCache(directory=tmp_path, max_bytes=2500)
+    first.clear()
+    first.set("first 0", b"x" * 1000)
+    second.set("second 0", b"x" * 1000)
+    first.set("first 1", b"x" * 1000)
+    second.set("second 1", b"x" * 1000)
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.dill")) <= 2500
+
+
+def test_chat_session_moves_between_workers(basic_data_graph, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cache_backend", "shared")
+    builds = []
+
+    def build(data_graph):
+        builds.append(data_graph)
+        return build_graph(data_graph).build()
+
+    async def answer(langchain_object, message, **kwargs):
+        return message.upper(), ""
+
+    class Socket:
+        async def send_json(self, data):
+            pass
+
+    monkeypatch.setattr(run, "build_langchain_object", build)
+    monkeypatch.setattr(chat_manager, "get_result_and_steps", answer)
+    # Two workers on one shared backend
+    workers = []
+    for _ in range(2):
+        worker = chat_manager.ChatManager()
+        cache_manager.detach(worker.update)
+        worker.chat_history = chat_manager.ChatHistory(
+            directory=tmp_path / "logs",
+            sessions=SharedCache(namespace="chat_sessions", directory=tmp_path),
+        )
+        worker.active_connections["moving"] = Socket()
+        workers.append(worker)
+
+    for i in range(4):
+        payload = {**basic_data_graph, "message": f"message {i}"}
+        asyncio.run(workers[i % 2].process_message("moving", payload))
+
+    # The session was built by the first message only
+    assert len(builds) == 1
+    history = workers[0].chat_history.get_history("moving")
+    assert [msg.message for msg in history[-2:]] == ["message 3", "MESSAGE 3"]
+    assert len(workers[1].chat_history.get_turns("moving")) == 4
+    session_objects.pop("moving")
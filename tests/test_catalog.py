@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+from langflow.interface.catalog import ComponentCatalog, get_source_mtime
+from langflow.settings import settings
+
+
+def test_catalog_is_built_once(tmp_path, monkeypatch):
+    catalog = ComponentCatalog(snapshot_dir=tmp_path)
+    calls = []
+
+    def build_types():
+        calls.append(1)
+        return {"chains": {"LLMChain": {"base_classes": {"Chain"}}}}
+
+    monkeypatch.setattr(
+        "langflow.interface.types.build_langchain_types_dict", build_types
+    )
+    entry = catalog.get()
+    assert catalog.get() is entry
+    assert len(calls) == 1
+    assert json.loads(entry.body) == {
+        "chains": {"LLMChain": {"base_classes": ["Chain"]}}
+    }
+
+
+def test_catalog_etag_matching(tmp_path, monkeypatch):
+    catalog = ComponentCatalog(snapshot_dir=tmp_path)
+    monkeypatch.setattr(
+        "langflow.interface.types.build_langchain_types_dict", lambda: {}
+    )
+    entry = catalog.get()
+    assert entry.matches(entry.etag)
+    assert entry.matches(f'"other", W/{entry.etag}')
+    assert entry.matches("*")
+    assert not entry.matches('"other"')
+    assert not entry.matches(None)
+
+
+def test_catalog_snapshot_is_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "langflow.interface.types.build_langchain_types_dict",
+        lambda: {"llms": {}},
+    )
+    entry = ComponentCatalog(snapshot_dir=tmp_path).get()
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    def fail():
+        raise AssertionError("Catalog should be loaded from the snapshot")
+
+    monkeypatch.setattr("langflow.interface.types.build_langchain_types_dict", fail)
+    loaded_entry = ComponentCatalog(snapshot_dir=tmp_path).get()
+    assert loaded_entry.body == entry.body
+    assert loaded_entry.etag == entry.etag
+
+
+def test_catalog_prunes_stale_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "langflow.interface.types.build_langchain_types_dict", lambda: {}
+    )
+    catalog = ComponentCatalog(snapshot_dir=tmp_path)
+    stale = tmp_path / "0123456789abcdef-settings.json"
+    stale.write_text("{}")
+    current = catalog.snapshot_path("other-settings")
+    current.write_text("{}")
+
+    catalog.get()
+    # Snapshots of the current sources are kept for other settings
+    assert sorted(tmp_path.glob("*.json")) == sorted(
+        [current, catalog.snapshot_path(settings.fingerprint())]
+    )
+
+
+def test_source_mtime_is_computed_once(monkeypatch):
+    get_source_mtime.cache_clear()
+    mtime = get_source_mtime()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The sources should not be scanned again")
+
+    monkeypatch.setattr(Path, "rglob", fail)
+    assert get_source_mtime() == mtime
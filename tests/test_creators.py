@@ -48,3 +48,23 @@ def test_agent_creator_type_to_loader_dict(sample_agent_creator: AgentCreator):
     type_to_loader_dict = sample_agent_creator.type_to_loader_dict
     assert len(type_to_loader_dict) > 0
     assert "JsonAgent"
+
+
+def test_lazy_class_registry_imports_on_access():
+    from langflow.interface.importing.utils import LazyClassRegistry
+
+    registry = LazyClassRegistry("collections", ["OrderedDict", "Counter"])
+    assert list(registry) == ["OrderedDict", "Counter"]
+    assert "Counter" in registry
+    assert registry._loaded == {}
+
+    from collections import Counter
+
+    assert registry["Counter"] is Counter
+    assert list(registry._loaded) == ["Counter"]
+    with pytest.raises(KeyError):
+        registry["defaultdict"]
+
+    subset = registry.subset(["Counter"])
+    assert list(subset) == ["Counter"]
+    assert subset["Counter"] is Counter
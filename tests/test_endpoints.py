@@ -1,5 +1,10 @@
+import asyncio
+import base64
+import json
+
 import pytest
 from fastapi.testclient import TestClient
+from langflow.interface import run
 from langflow.interface.tools.constants import CUSTOM_TOOLS
 
 
@@ -121,3 +126,234 @@ def test_various_prompts(client, prompt, expected_input_variables):
     assert response.json() == {
         "input_variables": expected_input_variables,
     }
+
+
+def test_get_all_etag(client: TestClient):
+    response = client.get("/all")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag
+
+    cached_response = client.get("/all", headers={"If-None-Match": etag})
+    assert cached_response.status_code == 304
+    assert cached_response.headers["ETag"] == etag
+    assert not cached_response.content
+
+    stale_response = client.get("/all", headers={"If-None-Match": '"stale"'})
+    assert stale_response.status_code == 200
+    assert stale_response.json() == response.json()
+
+
+def test_get_cache_stats(client: TestClient):
+    response = client.get("/cache/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert "build_langchain_object_with_caching" in stats
+    assert set(stats["built_objects"]) >= {"hits", "misses", "evictions"}
+
+
+def test_upload_file(client: TestClient, blob_store, tmp_path):
+    content = "data:text/plain;base64," + base64.b64encode(b"Hello").decode()
+    response = client.post("/upload", json={"file_name": "a.txt", "content": content})
+    assert response.status_code == 200
+    upload = response.json()
+    assert upload["file_name"] == "a.txt"
+    assert upload["size"] == 5
+    assert upload["reference"] == f"blob:{upload['hash']}"
+    assert (tmp_path / "blobs" / upload["hash"] / "a.txt").read_bytes() == b"Hello"
+    # The same content is stored once
+    response = client.post("/upload", json={"file_name": "a.txt", "content": content})
+    assert response.json()["hash"] == upload["hash"]
+
+
+class EchoChain:
+    """A chain that answers with the message in upper case"""
+
+    memory = None
+    input_keys = ["input"]
+    output_keys = ["output"]
+
+    async def acall(self, inputs, callbacks=None):
+        if inputs["input"] == "fail":
+            raise ValueError("Failed")
+        return {"output": inputs["input"].upper()}
+
+
+def batch_request(messages, **kwargs):
+    exported_flow = {
+        "description": "",
+        "name": "Echo",
+        "id": "echo",
+        "data": {"nodes": [], "edges": []},
+    }
+    return {"messages": messages, "exported_flow": exported_flow, **kwargs}
+
+
+def test_predict_batch(client: TestClient, monkeypatch):
+    monkeypatch.setattr(
+        run, "load_or_build_langchain_object", lambda *args, **kwargs: EchoChain()
+    )
+    messages = [f"message {i}" for i in range(10)] + ["fail"]
+    response = client.post("/predict/batch", json=batch_request(messages))
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == list(range(11))
+    assert results[3]["result"] == "MESSAGE 3"
+    assert results[-1]["result"] is None
+    assert "Failed" in results[-1]["error"]
+
+
+def test_predict_batch_stream(client: TestClient, monkeypatch):
+    monkeypatch.setattr(
+        run, "load_or_build_langchain_object", lambda *args, **kwargs: EchoChain()
+    )
+    messages = ["a", "b", "c"]
+    response = client.post(
+        "/predict/batch", json=batch_request(messages, stream=True, concurrency=2)
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((line["index"], line["result"]) for line in lines) == [
+        (0, "A"),
+        (1, "B"),
+        (2, "C"),
+    ]
+
+
+class StreamingEchoChain(EchoChain):
+    """An echo chain that streams each character as a token"""
+
+    async def acall(self, inputs, callbacks=None):
+        output = await super().acall(inputs)
+        for token in output["output"]:
+            for callback in callbacks or []:
+                await callback.on_llm_new_token(token)
+        return output
+
+
+def test_predict_stream(client: TestClient, monkeypatch):
+    monkeypatch.setattr(
+        run,
+        "load_or_build_langchain_object",
+        lambda *args, **kwargs: StreamingEchoChain(),
+    )
+    response = client.post("/predict/stream", json=batch_request([], message="hey"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    # Tokens are sent together, but in order
+    stream = [event["message"] for event in events if event["type"] == "stream"]
+    assert "".join(stream) == "HEY"
+    assert events[-1]["type"] == "end"
+    assert events[-1]["message"] == "HEY"
+
+    response = client.post("/predict/stream", json=batch_request([], message="fail"))
+    assert response.status_code == 200
+    assert '"type": "error"' in response.text
+
+
+class SyncStreamingEchoChain(EchoChain):
+    """An echo chain that can only stream when called synchronously"""
+
+    def __init__(self):
+        # Shared with the copies the chain is run on
+        self.ran_on_loop = []
+
+    async def acall(self, inputs, callbacks=None):
+        raise NotImplementedError
+
+    def __call__(self, inputs, callbacks=None):
+        try:
+            asyncio.get_running_loop()
+            self.ran_on_loop.append(True)
+        except RuntimeError:
+            self.ran_on_loop.append(False)
+        output = inputs["input"].upper()
+        for token in output:
+            for callback in callbacks or []:
+                callback.on_llm_new_token(token)
+        return {"output": output}
+
+
+def test_predict_stream_sync_chain(client: TestClient, monkeypatch):
+    chain = SyncStreamingEchoChain()
+    monkeypatch.setattr(
+        run, "load_or_build_langchain_object", lambda *args, **kwargs: chain
+    )
+    message = "a longer message " * 50
+    response = client.post("/predict/stream", json=batch_request([], message=message))
+    assert response.status_code == 200
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    stream = [event["message"] for event in events if event["type"] == "stream"]
+    assert "".join(stream) == message.upper()
+    assert events[-1]["type"] == "end"
+    # The chain ran on the thread pool, not on the event loop
+    assert chain.ran_on_loop == [False]
+
+
+def test_register_and_predict_flow(client: TestClient, monkeypatch):
+    with open(pytest.BASIC_EXAMPLE_PATH, "r") as f:
+        exported_flow = json.load(f)
+    response = client.post("/flows", json=exported_flow)
+    assert response.status_code == 200
+    registered = response.json()
+    assert registered["id"] == exported_flow["id"]
+
+    calls = []
+
+    async def answer(langchain_object, message):
+        calls.append(langchain_object)
+        return message.upper(), ""
+
+    monkeypatch.setattr(run, "aget_result_and_thought", answer)
+    for message in ["hello", "again"]:
+        response = client.post(
+            f"/flows/{registered['id']}/predict", json={"message": message}
+        )
+        assert response.status_code == 200
+        assert response.json()["result"] == message.upper()
+    # The flow is built once, when it's registered
+    assert calls[0] is calls[1]
+
+    response = client.delete(f"/flows/{registered['id']}")
+    assert response.status_code == 200
+    response = client.post(f"/flows/{registered['id']}/predict", json={"message": "hi"})
+    assert response.status_code == 404
+
+
+def test_registered_flow_ids_dont_collide(client: TestClient, monkeypatch):
+    with open(pytest.BASIC_EXAMPLE_PATH, "r") as f:
+        exported_flow = json.load(f)
+    exported_flow["id"] = "batch"
+    assert client.post("/flows", json=exported_flow).status_code == 200
+
+    async def answer(langchain_object, message):
+        return message.upper(), ""
+
+    monkeypatch.setattr(run, "aget_result_and_thought", answer)
+    response = client.post("/flows/batch/predict", json={"message": "hi"})
+    assert response.status_code == 200
+    assert response.json()["result"] == "HI"
+    client.delete("/flows/batch")
+
+
+def test_register_invalid_flow(client: TestClient):
+    exported_flow = {
+        "description": "",
+        "name": "Invalid",
+        "id": "invalid",
+        "data": {"nodes": [], "edges": []},
+    }
+    response = client.post("/flows", json=exported_flow)
+    assert response.status_code == 400
+    response = client.post("/predict/invalid", json={"message": "hi"})
+    assert response.status_code == 404
@@ -1,20 +1,31 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from typing import Type, Union
 
 import pytest
 from langchain.chains.base import Chain
 from langchain.llms.fake import FakeListLLM
+from langflow.api.callback import QueueSender
+from langflow.cache.base import built_object_cache
 from langflow.graph import Edge, Graph, Node
+from langflow.graph.constants import InstancePolicy
+from langflow.graph.graph import get_node_type_map, invalidate_node_type_map
 from langflow.graph.nodes import (
     AgentNode,
     ChainNode,
     FileToolNode,
     LLMNode,
+    MemoryNode,
     PromptNode,
     ToolkitNode,
     ToolNode,
     WrapperNode,
 )
-from langflow.interface.run import get_result_and_thought
+from langflow.graph.planner import BuildPlanner, BuildReport
+from langflow.interface import run
+from langflow.interface.run import aget_result_and_thought, get_result_and_thought
 from langflow.utils.payload import get_root_node
 
 # Test cases for the graph module
@@ -167,6 +178,30 @@ def test_get_node(basic_graph):
     assert node.id == node_id
 
 
+def test_get_node_not_found(basic_graph):
+    """Test getting a node that is not in the graph"""
+    assert basic_graph.get_node("not_a_node") is None
+
+
+def test_get_nodes_with_source(basic_graph):
+    """Test that source and target lookups mirror each other"""
+    root = get_root_node(basic_graph)
+    assert basic_graph.get_nodes_with_source(root) == []
+    for node in basic_graph.get_nodes_with_target(root):
+        assert root in basic_graph.get_nodes_with_source(node)
+
+
+def test_node_type_map_is_cached():
+    """Test that the node type map is only rebuilt when invalidated"""
+    node_type_map = get_node_type_map()
+    assert node_type_map["LLMChain"] is ChainNode
+    assert get_node_type_map() is node_type_map
+    invalidate_node_type_map()
+    rebuilt_map = get_node_type_map()
+    assert rebuilt_map is not node_type_map
+    assert rebuilt_map == node_type_map
+
+
 def test_build_nodes(basic_graph):
     """Test building nodes"""
 
@@ -244,6 +279,67 @@ def test_build(basic_graph, complex_graph, openapi_graph):
     assert_agent_was_built(openapi_graph)
 
 
+def test_build_plan_order(complex_graph):
+    """Test that every node is planned after its dependencies"""
+    planner = BuildPlanner(complex_graph)
+    root = get_root_node(complex_graph)
+    order = planner.plan(root)
+    assert order[-1] == root
+    assert len(order) == len(set(order))
+    positions = {node: index for index, node in enumerate(order)}
+    for node in order:
+        for dependency in planner.get_dependencies(node):
+            assert positions[dependency] < positions[node]
+
+
+def test_build_report(complex_graph):
+    """Test that the build records each node once"""
+    complex_graph.build()
+    report = complex_graph.build_report
+    assert report is not None
+    assert not report.failed
+    node_ids = [record.node_id for record in report.records]
+    assert len(node_ids) == len(set(node_ids))
+    assert set(node_ids) == {node.id for node in complex_graph.nodes}
+    assert report.slowest() is not None
+    assert report.total_duration >= sum(record.duration for record in report.records)
+    assert BuildReport().slowest() is None
+
+
+def test_concurrent_build(complex_graph):
+    """Test building independent branches on a thread pool"""
+    planner = BuildPlanner(complex_graph)
+    root = get_root_node(complex_graph)
+    result = planner.build(root, max_workers=4)
+    assert isinstance(result, Chain)
+    assert all(node._built for node in planner.plan(root))
+    assert len(planner.report.records) == len(complex_graph.nodes)
+    assert not planner.report.failed
+
+
+def test_concurrent_build_error(basic_graph):
+    """Test that a failing node stops the concurrent build"""
+    llm_node = get_node_by_type(basic_graph, LLMNode)
+    assert llm_node is not None
+    llm_node.params["not_a_param"] = object()
+    llm_node.node_type = "NotAnLLM"
+    planner = BuildPlanner(basic_graph)
+    with pytest.raises(ValueError):
+        planner.build(get_root_node(basic_graph), max_workers=2)
+    assert planner.report.failed
+    root = get_root_node(basic_graph)
+    assert not root._built
+
+
+def test_node_without_base_type(basic_graph):
+    """Test that a node of an unknown base type can't be built"""
+    llm_node = get_node_by_type(basic_graph, LLMNode)
+    assert llm_node is not None
+    llm_node.base_type = None
+    with pytest.raises(ValueError, match="Base type"):
+        llm_node._instantiate()
+
+
 def assert_agent_was_built(graph):
     """Assert that the agent was built"""
     assert isinstance(graph, Graph)
@@ -317,6 +413,76 @@ def test_wrapper_node_build(openapi_graph):
     # Add any further assertions specific to the WrapperNode's build() method
 
 
+def test_instance_policies(basic_graph):
+    """Test that nodes hand out their built objects as per their policy"""
+    chain_node = get_node_by_type(basic_graph, ChainNode)
+    assert chain_node is not None
+    assert chain_node.instance_policy == InstancePolicy.SHARED
+    assert chain_node.build() is chain_node.build()
+
+    memory_node = get_node_by_type(basic_graph, MemoryNode)
+    assert memory_node is not None
+    assert memory_node.instance_policy == InstancePolicy.FACTORY
+    params = dict(memory_node.params)
+    first, second = memory_node.build(), memory_node.build()
+    assert first is not second
+    assert type(first) is type(second)
+    # The params are left untouched so more instances can be created
+    assert memory_node.params == params
+
+
+def test_clone_policy_returns_copies(basic_graph):
+    """Test that nodes without a policy of their own hand out copies"""
+    node = Node(get_node_by_type(basic_graph, MemoryNode)._data)
+    assert node.instance_policy == InstancePolicy.CLONE
+    node._build_params()
+    assert node.build() is not node.build()
+    assert node.build() is not node._built_object
+
+
+def copy_graph(graph: Graph) -> Graph:
+    """Build a new graph from the same data"""
+    return Graph(deepcopy(graph._nodes), deepcopy(graph._edges))
+
+
+def test_content_hash(basic_graph):
+    """Test that nodes are hashed by their own values and their subgraph"""
+    graph, same_graph, edited_graph = (
+        basic_graph,
+        copy_graph(basic_graph),
+        copy_graph(basic_graph),
+    )
+    root = get_root_node(graph)
+    assert root.content_hash() == get_root_node(same_graph).content_hash()
+
+    # Editing the LLM changes its hash and the hash of everything downstream
+    llm_node = get_node_by_type(edited_graph, LLMNode)
+    llm_node.data["node"]["template"]["temperature"]["value"] = 0.123
+    assert llm_node.content_hash() != get_node_by_type(graph, LLMNode).content_hash()
+    assert get_root_node(edited_graph).content_hash() != root.content_hash()
+    memory_node = get_node_by_type(edited_graph, MemoryNode)
+    assert (
+        memory_node.content_hash() == get_node_by_type(graph, MemoryNode).content_hash()
+    )
+
+
+def test_cacheable_nodes_are_reused(basic_graph, monkeypatch):
+    """Test that cacheable nodes reuse objects built by identical subgraphs"""
+    monkeypatch.setattr(MemoryNode, "cacheable", True)
+    built_object_cache.clear()
+    first_graph, second_graph = basic_graph, copy_graph(basic_graph)
+    first_graph.build()
+    first_memory = get_node_by_type(first_graph, MemoryNode)
+
+    second_memory = get_node_by_type(second_graph, MemoryNode)
+    monkeypatch.setattr(
+        second_memory, "_build", lambda: pytest.fail("Should have been cached")
+    )
+    second_graph.build()
+    assert second_memory._built_object is first_memory._built_object
+    built_object_cache.clear()
+
+
 def test_get_result_and_thought(basic_graph):
     """Test the get_result_and_thought method"""
     responses = [
@@ -340,3 +506,193 @@ def test_get_result_and_thought(basic_graph):
     assert isinstance(result, str)
     # The thought should be a Thought
     assert isinstance(thought, str)
+    assert "Entering new TimeTravelGuideChain chain" in thought
+
+
+def test_concurrent_thoughts_are_separate(basic_graph):
+    """Test that concurrent runs don't record each other's thoughts"""
+
+    def run_flow(message: str):
+        graph = copy_graph(basic_graph)
+        langchain_object = build_with_llm(graph, FakeListLLM(responses=[message]))
+        return get_result_and_thought(langchain_object, message)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        messages = [f"message {i}" for i in range(8)]
+        for message, (result, thought) in zip(
+            messages, executor.map(run_flow, messages)
+        ):
+            assert result == message
+            assert thought.count("Entering new") == 1
+            assert f"Human: {message}" in thought
+
+
+class AsyncFakeListLLM(FakeListLLM):
+    async def _acall(self, prompt, stop=None, run_manager=None):
+        return self._call(prompt, stop=stop)
+
+
+def build_with_llm(graph: Graph, llm) -> Chain:
+    llm_node = get_node_by_type(graph, LLMNode)
+    assert llm_node is not None
+    llm_node._built_object = llm
+    llm_node._built = True
+    return graph.build()
+
+
+def test_aget_result_and_thought(basic_graph, monkeypatch):
+    """Test that async chains are called without the thread pool"""
+    langchain_object = build_with_llm(
+        basic_graph, AsyncFakeListLLM(responses=["I am a response"])
+    )
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("Should not run on the thread pool")
+
+    monkeypatch.setattr(run, "run_in_executor", fail)
+    result, thought = asyncio.run(aget_result_and_thought(langchain_object, "Hello"))
+    assert result == "I am a response"
+    assert "Entering new TimeTravelGuideChain chain" in thought
+
+
+def test_aget_result_and_thought_sync_fallback(basic_graph):
+    """Test that sync only chains run on the thread pool"""
+    langchain_object = build_with_llm(
+        basic_graph, FakeListLLM(responses=["I am a response"])
+    )
+    result, thought = asyncio.run(aget_result_and_thought(langchain_object, "Hello"))
+    assert result == "I am a response"
+    assert isinstance(thought, str)
+
+
+def test_batch_with_memory_isolates_messages(basic_graph, monkeypatch):
+    """Test that messages of a batch don't share a conversation"""
+
+    def build(*args, **kwargs):
+        llm = AsyncFakeListLLM(responses=["Answer"] * 10)
+        return build_with_llm(copy_graph(basic_graph), llm)
+
+    monkeypatch.setattr(run, "load_or_build_langchain_object", build)
+    monkeypatch.setattr(run, "build_langchain_object", build)
+
+    async def process():
+        messages = [f"message {i}" for i in range(6)]
+        return [
+            item async for item in run.aprocess_graph_batch({}, messages, concurrency=3)
+        ]
+
+    results = asyncio.run(process())
+    assert sorted(index for index, _ in results) == list(range(6))
+    for index, response in results:
+        assert response["result"] == "Answer"
+        # Only this message is in the conversation
+        assert f"Human: message {index}" in response["thought"]
+        assert response["thought"].count("Human:") == 1
+
+
+def test_batch_with_memory_leaves_cached_object(basic_graph, monkeypatch):
+    """Test that a batch doesn't run on or clear the cached object of a flow"""
+    shared = build_with_llm(
+        copy_graph(basic_graph), AsyncFakeListLLM(responses=["Shared"] * 10)
+    )
+    shared.memory.save_context({"input": "earlier"}, {"response": "reply"})
+
+    def build(*args, **kwargs):
+        llm = AsyncFakeListLLM(responses=["Copy"] * 10)
+        return build_with_llm(copy_graph(basic_graph), llm)
+
+    monkeypatch.setattr(run, "load_or_build_langchain_object", lambda *args: shared)
+    monkeypatch.setattr(run, "build_langchain_object", build)
+
+    async def process():
+        messages = [f"message {i}" for i in range(4)]
+        return [
+            item async for item in run.aprocess_graph_batch({}, messages, concurrency=2)
+        ]
+
+    results = asyncio.run(process())
+    assert [response["result"] for _, response in results] == ["Copy"] * 4
+    assert "earlier" in shared.memory.buffer
+
+
+def test_batch_with_memory_without_copies(basic_graph, monkeypatch):
+    """Test that a batch runs on the cached object when no copy can be built"""
+    shared = build_with_llm(
+        copy_graph(basic_graph), AsyncFakeListLLM(responses=["Shared"] * 10)
+    )
+    shared.memory.save_context({"input": "earlier"}, {"response": "reply"})
+
+    def fail(*args, **kwargs):
+        raise ValueError("Can't build")
+
+    monkeypatch.setattr(run, "load_or_build_langchain_object", lambda *args: shared)
+    monkeypatch.setattr(run, "build_langchain_object", fail)
+
+    async def process():
+        messages = [f"message {i}" for i in range(3)]
+        return [
+            item async for item in run.aprocess_graph_batch({}, messages, concurrency=3)
+        ]
+
+    results = asyncio.run(process())
+    # The messages ran one at a time, in order, and the memory was kept
+    assert [index for index, _ in results] == [0, 1, 2]
+    assert "earlier" in shared.memory.buffer
+
+
+def test_empty_batch_doesnt_build_the_flow(monkeypatch):
+    """Test that a batch without messages returns before building anything"""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The flow should not be built")
+
+    monkeypatch.setattr(run, "load_or_build_langchain_object", fail)
+    monkeypatch.setattr(run, "build_langchain_object", fail)
+
+    async def process():
+        return [item async for item in run.aprocess_graph_batch({}, [])]
+
+    assert asyncio.run(process()) == []
+
+
+def test_cancelled_sync_run_waits_for_its_thread():
+    """Test that a cancelled sync run ends once its chain is done"""
+    finished = []
+
+    def chain(inputs, callbacks=None):
+        time.sleep(0.2)
+        finished.append(inputs)
+        return {}
+
+    async def run_and_cancel():
+        sender = QueueSender()
+        task = asyncio.create_task(
+            run.arun_sync_streaming(chain, {"input": "hi"}, websocket=sender)
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return list(finished)
+
+    assert asyncio.run(run_and_cancel()) == [{"input": "hi"}]
+
+
+def test_stream_result_leaves_cached_object(basic_graph):
+    """Test that streaming a result doesn't change the options of the cached object"""
+    langchain_object = build_with_llm(
+        basic_graph, AsyncFakeListLLM(responses=["I am a response"])
+    )
+    verbose = langchain_object.verbose
+
+    async def stream():
+        return [
+            response async for response in run.astream_result(langchain_object, "Hi")
+        ]
+
+    responses = asyncio.run(stream())
+    assert responses[-1]["type"] == "end"
+    assert responses[-1]["message"] == "I am a response"
+    assert langchain_object.verbose == verbose
+    # The memory is still shared
+    assert "Hi" in langchain_object.memory.buffer
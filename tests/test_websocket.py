@@ -1,8 +1,19 @@
+import asyncio
 import json
+import time
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 
+from langflow.api.callback import (
+    AsyncStreamingLLMCallbackHandler,
+    QueueSender,
+    encode_stream_frame,
+)
+from langflow.api.chat_manager import ChatHistory
+from langflow.api.schemas import ChatMessage, ChatResponse, FileResponse
+from langflow.settings import settings
+
 
 def test_websocket_connection(client: TestClient):
     with client.websocket_connect("/chat/test_client") as websocket:
@@ -45,3 +56,247 @@ def test_chat_history(client: TestClient):
                 "intermediate_steps": "",
                 "files": [],
             }
+
+
+def test_encode_stream_frame():
+    for text in ["token", 'with "quotes"\n', "ünïcode"]:
+        response = ChatResponse(message=text, type="stream", intermediate_steps="")
+        assert json.loads(encode_stream_frame(text)) == response.dict()
+
+
+def test_streaming_handler_coalesces_tokens():
+    async def stream(tokens, **kwargs):
+        sender = QueueSender()
+        handler = AsyncStreamingLLMCallbackHandler(sender, **kwargs)
+        for token in tokens:
+            await handler.on_llm_new_token(token)
+        await asyncio.sleep(0.05)
+        await handler.on_llm_end(None)
+        await sender.close()
+        return [json.loads(frame)["message"] async for frame in sender]
+
+    # Sent once max_tokens are buffered, and the rest when the LLM ends
+    frames = asyncio.run(stream("abcde", max_tokens=2, flush_interval=10))
+    assert frames == ["ab", "cd", "e"]
+    # Or once the flush interval has passed since the first token
+    frames = asyncio.run(stream("abc", max_tokens=32, flush_interval=0.01))
+    assert frames == ["abc"]
+
+
+def add_turn(chat_history, client_id, message, response, **kwargs):
+    chat_history.add_message(client_id, ChatMessage(message=message))
+    chat_history.add_message(
+        client_id,
+        ChatResponse(message=response, type="end", intermediate_steps="", **kwargs),
+    )
+
+
+def test_chat_history_is_bounded(tmp_path):
+    chat_history = ChatHistory(max_turns=3, directory=tmp_path)
+    for i in range(5):
+        add_turn(chat_history, "client", f"message {i}", f"answer {i}")
+
+    turns = chat_history.get_turns("client")
+    assert [turn.message for turn in turns] == [f"message {i}" for i in range(2, 5)]
+    history = chat_history.get_history("client")
+    assert [msg.message for msg in history[-2:]] == ["message 4", "answer 4"]
+    # Older turns are moved to disk
+    spilled = chat_history.get_spilled("client")
+    assert [(record["message"], record["response"]) for record in spilled] == [
+        ("message 0", "answer 0"),
+        ("message 1", "answer 1"),
+    ]
+
+    chat_history.empty_history("client")
+    assert chat_history.get_history("client") == []
+    assert chat_history.get_spilled("client") == []
+
+
+def test_chat_history_keeps_a_record_per_turn(tmp_path, blob_store):
+    chat_history = ChatHistory(directory=tmp_path)
+    chat_history.add_message("client", ChatMessage(message="draw"))
+    chat_history.add_message(
+        "client", ChatResponse(message=None, type="start", intermediate_steps="")
+    )
+    for token in ["a ", "cat"]:
+        chat_history.add_message(
+            "client", ChatResponse(message=token, type="stream", intermediate_steps="")
+        )
+    image = FileResponse(message=None, data="aW1hZ2U=", data_type="image")
+    chat_history.add_message("client", image)
+
+    # Files wait for the end of the turn
+    assert chat_history.take_files("client") == [image]
+    assert chat_history.take_files("client") == []
+    chat_history.add_message(
+        "client",
+        ChatResponse(message="a cat", type="end", intermediate_steps="", files=[image]),
+    )
+    (turn,) = chat_history.get_turns("client")
+    assert (turn.message, turn.response) == ("draw", "a cat")
+    # The record keeps the digest of the file instead of its data
+    assert [file.data_type for file in turn.files] == ["image"]
+    assert "aW1hZ2U=" not in turn.json()
+
+    history = chat_history.get_history("client", filter_messages=False)
+    assert [msg.type for msg in history] == ["human", "end"]
+    assert [(file.data, file.data_type) for file in history[-1].files] == [
+        ("aW1hZ2U=", "image")
+    ]
+
+
+def test_chat_history_expires_idle_sessions(tmp_path):
+    chat_history = ChatHistory(session_ttl=60, directory=tmp_path)
+    chat_history.add_message("idle", ChatMessage(message="hi"))
+    chat_history.add_message("active", ChatMessage(message="hi"))
+    chat_history.touch("idle", seen_at=time.time() - 120)
+    chat_history.touch("active", seen_at=time.time() - 120)
+
+    assert chat_history.expire_idle_sessions(active={"active"}) == ["idle"]
+    assert chat_history.get_history("idle") == []
+    assert len(chat_history.get_history("active")) == 1
+
+
+def test_cancel_turn(client: TestClient):
+    cancelled = []
+
+    async def process_graph(chat_message, **kwargs):
+        if chat_message.message == "slow":
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append(chat_message.message)
+                raise
+        return chat_message.message.upper(), ""
+
+    with patch("langflow.api.chat_manager.process_graph", process_graph):
+        with client.websocket_connect("/chat/cancel_client") as websocket:
+            assert websocket.receive_json() == []
+            websocket.send_json(json.dumps({"message": "slow"}))
+            assert websocket.receive_json()["type"] == "start"
+            # The server reads messages while the turn runs
+            websocket.send_json(json.dumps({"cancel": True}))
+            response = websocket.receive_json()
+            assert response["type"] == "end"
+            assert response["message"] is None
+            assert cancelled == ["slow"]
+
+            websocket.send_json(json.dumps({"message": "fast"}))
+            assert websocket.receive_json()["type"] == "start"
+            response = websocket.receive_json()
+            assert response["type"] == "end"
+            assert response["message"] == "FAST"
+
+        # Leaving stops the running turn
+        with client.websocket_connect("/chat/cancel_client") as websocket:
+            websocket.receive_json()
+            websocket.send_json(json.dumps({"message": "slow"}))
+            assert websocket.receive_json()["type"] == "start"
+        # The server finishes closing the connection in the background
+        for _ in range(100):
+            if len(cancelled) == 2:
+                break
+            time.sleep(0.01)
+        assert cancelled == ["slow", "slow"]
+
+
+def test_cancel_turn_drops_its_files(client: TestClient):
+    from langflow.api.chat import chat_manager
+
+    async def process_graph(client_id, chat_message, **kwargs):
+        if chat_message.message == "slow":
+            chat_manager.chat_history.add_message(
+                client_id, FileResponse(message=None, data="image", data_type="image")
+            )
+            await asyncio.sleep(30)
+        return chat_message.message.upper(), ""
+
+    with patch("langflow.api.chat_manager.process_graph", process_graph):
+        with client.websocket_connect("/chat/cancel_files_client") as websocket:
+            websocket.receive_json()
+            websocket.send_json(json.dumps({"message": "slow"}))
+            assert websocket.receive_json()["type"] == "start"
+            websocket.send_json(json.dumps({"cancel": True}))
+            assert websocket.receive_json()["type"] == "end"
+
+            websocket.send_json(json.dumps({"message": "fast"}))
+            assert websocket.receive_json()["type"] == "start"
+            response = websocket.receive_json()
+            assert response["message"] == "FAST"
+            # The file belonged to the cancelled turn
+            assert response["files"] == []
+
+    history = chat_manager.chat_history.get_history("cancel_files_client")
+    # The cancelled turn is recorded with an empty answer
+    assert [(msg.type, msg.message) for msg in history] == [
+        ("human", "slow"),
+        ("end", None),
+        ("human", "fast"),
+        ("end", "FAST"),
+    ]
+
+
+def test_streaming_handler_timer_flush_errors_are_handled():
+    class ClosedSocket:
+        async def send_text(self, data):
+            raise RuntimeError("closed")
+
+    async def stream():
+        handler = AsyncStreamingLLMCallbackHandler(
+            ClosedSocket(), max_tokens=32, flush_interval=0.01
+        )
+        await handler.on_llm_new_token("a")
+        await asyncio.sleep(0.05)
+        # The handler keeps the task the timer started, which handled the error
+        timer_flush = handler._timer_flush
+        assert timer_flush is not None and timer_flush.done()
+        assert timer_flush.exception() is None
+        await handler.flush()
+
+        await handler.on_llm_new_token("b")
+        handler.cancel()
+        await asyncio.sleep(0.05)
+        assert handler._timer_flush is None
+
+    asyncio.run(stream())
+
+
+def test_sessions_expire_in_the_background(tmp_path, monkeypatch):
+    from langflow.api.chat import chat_manager
+
+    chat_history = ChatHistory(session_ttl=60, directory=tmp_path)
+    monkeypatch.setattr(chat_manager, "chat_history", chat_history)
+    chat_history.add_message("idle", ChatMessage(message="hi"))
+    chat_history.touch("idle", seen_at=time.time() - 120)
+
+    async def expire():
+        task = asyncio.create_task(chat_manager.expire_sessions(interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(expire())
+    assert chat_history.get_history("idle") == []
+
+
+def test_chat_history_spills_off_the_loop(tmp_path):
+    chat_history = ChatHistory(max_turns=1, directory=tmp_path)
+
+    async def add_messages():
+        for i in range(3):
+            add_turn(chat_history, "client", f"message {i}", f"answer {i}")
+
+    asyncio.run(add_messages())
+    spilled = chat_history.get_spilled("client")
+    assert [record["message"] for record in spilled] == ["message 0", "message 1"]
+
+
+def test_chat_history_reads_settings_when_used(tmp_path, monkeypatch):
+    # The chat manager is created before the settings of --config are loaded
+    chat_history = ChatHistory(directory=tmp_path)
+    monkeypatch.setattr(settings, "chat_history_max_messages", 2)
+    monkeypatch.setattr(settings, "chat_session_ttl", 5)
+    for i in range(3):
+        add_turn(chat_history, "client", f"message {i}", f"answer {i}")
+
+    assert len(chat_history.get_turns("client")) == 2
+    assert chat_history.session_ttl == 5